@@ -0,0 +1,32 @@
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
+
+from avos.models.base import Base
+
+
+def demo_engine():
+    """SQLite engine for the demos: in-memory by default, AVOS_DEMO_DB=<path> keeps it on disk."""
+    db_path = os.getenv("AVOS_DEMO_DB", ":memory:")
+    engine = create_engine(f"sqlite:///{db_path}")
+    if db_path != ":memory:":
+        # Demo data only: skip fsync and keep the journal in memory (no durability on crash)
+        @event.listens_for(engine, "connect")
+        def _fast_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA synchronous=OFF")
+            cursor.execute("PRAGMA journal_mode=MEMORY")
+            cursor.close()
+
+    return engine
+
+
+def demo_session() -> Session:
+    """Session on a fresh `demo_engine` with the schema created."""
+    engine = demo_engine()
+    Base.metadata.create_all(engine)
+    # Service calls commit their own writes and flush wherever a later statement needs the rows
+    # (slots are written with Core UPDATEs), so the read-heavy demo sections need no implicit
+    # flush before every query
+    return sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)()
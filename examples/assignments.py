@@ -1,26 +1,26 @@
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import numpy as np
 
 # Import your AVOS components
-from avos.models.base import Base
 from avos.models.experiment import Experiment, ExperimentStatus
 from avos.services.layer_service import LayerService
 from avos.services.assignment_service import AssignmentService
-from avos.services.assignment_logger import LocalAssignmentLogger
+from avos.services.assignment_logger import InMemoryAssignmentLogger
 from avos.constants import BUCKET_SPACE
 from avos.utils.datetime_utils import utc_now
 
+from _demo_db import demo_session
+
 
 def main():
     # Database setup
-    engine = create_engine("sqlite:///avos_demo.db", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    session = demo_session()
 
     print("🚀 AVOS Assignment System Demo\n")
 
+    # One clock read so every experiment window is anchored to the same instant
+    now = utc_now()
+
     # Step 1: Create layers for different parts of your application
     print("📍 Creating layers...")
 
@@ -51,8 +51,8 @@ def main():
         variants=["blue", "green", "red"],
         traffic_allocation={"blue": 0.33, "green": 0.33, "red": 0.34},
         traffic_percentage=0.6,
-        start_date=utc_now() - timedelta(hours=1),
-        end_date=utc_now() + timedelta(days=14),
+        start_date=now - timedelta(hours=1),
+        end_date=now + timedelta(days=14),
         status=ExperimentStatus.ACTIVE,
         priority=1,
     )
@@ -68,8 +68,8 @@ def main():
         variants=["credit_first", "paypal_first"],
         traffic_allocation={"credit_first": 0.5, "paypal_first": 0.5},
         traffic_percentage=0.75,
-        start_date=utc_now() - timedelta(hours=2),
-        end_date=utc_now() + timedelta(days=10),
+        start_date=now - timedelta(hours=2),
+        end_date=now + timedelta(days=10),
         status=ExperimentStatus.ACTIVE,
         priority=1,
     )
@@ -78,7 +78,7 @@ def main():
     print(f"✅ Payment experiment added: {success}")
 
     # Step 3: Single user assignment
-    assignment_logger = LocalAssignmentLogger("examples/assignments.duckdb")
+    assignment_logger = InMemoryAssignmentLogger()
 
     print("\n👤 Single user assignment demo...")
 
@@ -92,59 +92,43 @@ def main():
     # Step 4: Bulk user assignments
     print("\n👥 Bulk user assignment demo...")
 
-    user_ids = [f"user_{i:06d}" for i in range(1000)]
+    # Ids as one UTF-8 numpy buffer, which the bulk hasher consumes without re-encoding
+    user_ids = np.char.add(b"user_", np.char.zfill(np.arange(1000).astype("S6"), 6))
     bulk_assignments = AssignmentService.assign_bulk_for_layer(
-        session, homepage_layer, user_ids
+        session, homepage_layer, user_ids, assignment_logger=assignment_logger
     )
-    assignment_logger.log_assignments(list(bulk_assignments.values()))
 
     print(f"Processed {len(bulk_assignments)} user assignments")
 
     # Step 5: Assignment distribution preview
     print("\n📊 Assignment distribution preview...")
 
-    preview = AssignmentService.preview_assignment_distribution(
-        session, homepage_layer, user_ids[:100]
+    previews = AssignmentService.preview_assignment_distribution_multi(
+        session, [homepage_layer, checkout_layer], user_ids[:100]
     )
-    print(f"Distribution preview: {preview}")
+    for layer_id, preview in previews.items():
+        print(f"Distribution preview ({layer_id}): {preview}")
 
     # Step 6: Query DuckDB assignment logs
     print("\n🗄️ Querying assignment logs from DuckDB...")
 
 
     # Query variant counts for an experiment
-    variant_counts = assignment_logger.con.execute("""
-        SELECT experiment_id, variant, COUNT(*) as count
-        FROM user_assignments
-        WHERE experiment_id = 'hero_button_colors'
-          AND status = 'assigned'
-        GROUP BY experiment_id, variant
-        ORDER BY count DESC
-    """).fetchall()
+    variant_counts = assignment_logger.report_variants("hero_button_colors")
 
     print("Variant distribution:")
     for row in variant_counts:
         print(f"  {row[0]} - {row[1]}: {row[2]} users")
 
     # Query assignment status breakdown
-    status_breakdown = assignment_logger.con.execute("""
-        SELECT status, COUNT(*) as count
-        FROM user_assignments
-        GROUP BY status
-    """).fetchall()
+    status_breakdown = assignment_logger.report_status()
 
     print("\nAssignment status breakdown:")
     for row in status_breakdown:
         print(f"  {row[0]}: {row[1]} assignments")
 
     # Query recent assignments
-    recent_assignments = assignment_logger.con.execute("""
-        SELECT unit_id, experiment_id, variant, assignment_timestamp
-        FROM user_assignments
-        WHERE status = 'assigned'
-        ORDER BY assignment_timestamp DESC
-        LIMIT 5
-    """).fetchall()
+    recent_assignments = assignment_logger.report_recent(limit=5)
 
     print("\nRecent assignments:")
     for row in recent_assignments:
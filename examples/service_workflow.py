@@ -1,25 +1,25 @@
 from pathlib import Path
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-from avos.models.base import Base
 from avos.services.assignment_service import AssignmentService
 from avos.services.config_sync import apply_layer_configs
-from avos.services.assignment_logger import LocalAssignmentLogger
+from avos.services.assignment_logger import InMemoryAssignmentLogger
 from avos.services.layer_service import LayerService
 from avos.srm_tester import SRMTester
 from avos.utils.config_loader import load_layer_configs_from_dir
 
+from _demo_db import demo_session
+
+
 def apply_and_report(session, config_dir: Path, label: str) -> None:
     configs = load_layer_configs_from_dir(str(config_dir))
     apply_layer_configs(session, configs)
     print(f"\n== {label} ==")
     summarize_layers(session)
+    print(f"active_experiments_now: {LayerService.get_active_experiment_ids(session)}")
 
 
 def summarize_layers(session) -> None:
-    layers = LayerService.get_layers(session)
+    layers = LayerService.get_layers(session, eager=True)
     if not layers:
         print("No layers")
         return
@@ -46,7 +46,8 @@ def show_assignments(session, unit_id: str) -> None:
 
 
 def show_metrics(session, sample_unit_ids) -> None:
-    layers = LayerService.get_layers(session)
+    # Layers share the one session, so load every layer's experiments in a single query up front
+    layers = LayerService.get_layers(session, eager=True)
     tester = SRMTester()
     for layer in layers:
         metrics = AssignmentService.preview_assignment_metrics(session, layer, sample_unit_ids, srm_tester=tester)
@@ -61,17 +62,14 @@ def main() -> None:
     config_v1 = config_root / "v1"
     config_v2 = config_root / "v2"
 
-    engine = create_engine("sqlite:///examples/workflow.db", echo=False)
-    Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
-    session = Session()
+    session = demo_session()
 
     try:
         apply_and_report(session, config_v1, "apply v1 configs")
         show_assignments(session, "user_123")
         show_metrics(session, [f"user_{i}" for i in range(200)])
 
-        logger = LocalAssignmentLogger("examples/workflow_assignments.duckdb")
+        logger = InMemoryAssignmentLogger()
         try:
             layer = LayerService.get_layer(session, "homepage_hero")
             if layer:
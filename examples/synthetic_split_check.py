@@ -1,3 +1,6 @@
+from dataclasses import dataclass
+
+import numpy as np
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -9,31 +12,52 @@ from avos.services.layer_service import LayerService
 from avos.srm_tester import SRMTester
 
 
-def _summarize(assignments):
-    total = len(assignments)
-    assigned = [a for a in assignments.values() if a["status"] == "assigned"]
-    rate = (len(assigned) / total) if total else 0.0
-    variants = {}
-    for assignment in assigned:
-        variants[assignment["variant"]] = variants.get(assignment["variant"], 0) + 1
-    return rate, variants
+@dataclass
+class AssignmentArrays:
+    """Bulk assignments as parallel arrays, one row per unit in request order."""
+
+    unit_ids: np.ndarray
+    statuses: np.ndarray
+    variants: np.ndarray  # "" for units without a variant
+
+    @classmethod
+    def from_assignments(cls, assignments):
+        values = assignments.values()
+        return cls(
+            unit_ids=np.array(list(assignments.keys()), dtype=str),
+            statuses=np.array([a["status"] for a in values], dtype=str),
+            variants=np.array([a["variant"] or "" for a in values], dtype=str),
+        )
+
+    @property
+    def assigned(self):
+        return self.statuses == "assigned"
 
 
-def _srm_for_assignments(assignments, expected_allocations):
-    assigned = [a for a in assignments.values() if a["status"] == "assigned"]
-    if not assigned:
+def _summarize(result):
+    rate = float(result.assigned.mean()) if len(result.statuses) else 0.0
+    keys, counts = np.unique(result.variants[result.assigned], return_counts=True)
+    return rate, dict(zip(keys.tolist(), counts.tolist()))
+
+
+def _srm_for_assignments(result, variant_names, expected_props):
+    assigned_variants = result.variants[result.assigned]
+    if not assigned_variants.size:
         return None
-    variants = list(expected_allocations.keys())
-    index = {variant: idx for idx, variant in enumerate(variants)}
-    counts = [0] * len(variants)
-    for assignment in assigned:
-        variant = assignment["variant"]
-        if variant in index:
-            counts[index[variant]] += 1
-    expected_props = [expected_allocations[variant] for variant in variants]
+    counts = [int(np.count_nonzero(assigned_variants == variant)) for variant in variant_names]
     return SRMTester().test(counts, expected_props)
 
 
+def _salt_overlap(unit_ids, salt_a, salt_b, total_slots, share):
+    """Units in the first `share` of slots under both salts; independent layers expect share**2 of all units."""
+    slots_a = AssignmentService._calculate_user_slots(salt_a, total_slots, unit_ids)
+    slots_b = AssignmentService._calculate_user_slots(salt_b, total_slots, unit_ids)
+    cutoff = int(total_slots * share)
+    in_a = np.flatnonzero(slots_a < cutoff)
+    in_b = np.flatnonzero(slots_b < cutoff)
+    return np.intersect1d(in_a, in_b, assume_unique=True).size
+
+
 def main():
     engine = create_engine("sqlite:///:memory:", echo=False)
     Base.metadata.create_all(engine)
@@ -41,6 +65,9 @@ def main():
     session = Session()
 
     expected_allocations = {"A": 0.5, "B": 0.5}
+    # Variant order and expected proportions are shared by every SRM check below
+    variant_names = tuple(expected_allocations)
+    expected_props = [expected_allocations[variant] for variant in variant_names]
     layer_config = LayerConfig(
         layer_id="layer_synth",
         layer_salt="salt_synth",
@@ -62,9 +89,13 @@ def main():
     layer = LayerService.get_layer(session, "layer_synth")
 
     unit_ids = [f"user_{i:05d}" for i in range(5000)]
-    before = AssignmentService.assign_bulk_for_layer(session, layer, unit_ids)
+    # The layer's salt never changes, so units keep their slots across the ramp-up; hash once
+    slot_indices = AssignmentService.calculate_slots(layer, unit_ids)
+    before = AssignmentArrays.from_assignments(
+        AssignmentService.assign_bulk_for_layer(session, layer, unit_ids, slot_indices=slot_indices)
+    )
     rate_before, variants_before = _summarize(before)
-    srm_before = _srm_for_assignments(before, expected_allocations)
+    srm_before = _srm_for_assignments(before, variant_names, expected_props)
 
     print("Before ramp-up")
     print(f"  assignment_rate: {rate_before:.3f}")
@@ -72,43 +103,30 @@ def main():
     if srm_before:
         print(f"  srm: {srm_before}")
 
-    ramped_config = LayerConfig(
-        layer_id="layer_synth",
-        layer_salt="salt_synth",
-        total_traffic_percentage=1.0,
-        experiments=[
-            ExperimentConfig(
-                experiment_id="exp_synth",
-                layer_id="layer_synth",
-                name="Synthetic Split",
-                variants=["A", "B"],
-                traffic_allocation=expected_allocations,
-                status="active",
-                traffic_percentage=0.5,
-                reserved_percentage=0.6,
-            )
-        ],
-    )
+    # Only the traffic share changes; copy the validated configs instead of rebuilding them
+    ramped_experiment = layer_config.experiments[0].model_copy(update={"traffic_percentage": 0.5})
+    ramped_config = layer_config.model_copy(update={"experiments": [ramped_experiment]})
     apply_layer_configs(session, [ramped_config])
 
-    after = AssignmentService.assign_bulk_for_layer(session, layer, unit_ids)
+    after = AssignmentArrays.from_assignments(
+        AssignmentService.assign_bulk_for_layer(session, layer, unit_ids, slot_indices=slot_indices)
+    )
     rate_after, variants_after = _summarize(after)
-    srm_after = _srm_for_assignments(after, expected_allocations)
+    srm_after = _srm_for_assignments(after, variant_names, expected_props)
 
-    stable_count = 0
-    for uid, assignment in before.items():
-        if assignment["status"] != "assigned":
-            continue
-        updated = after[uid]
-        if updated["status"] == "assigned" and updated["variant"] == assignment["variant"]:
-            stable_count += 1
+    # Both batches come from the same unit_ids, so rows line up
+    stable_count = int((before.assigned & after.assigned & (before.variants == after.variants)).sum())
 
     print("After ramp-up")
     print(f"  assignment_rate: {rate_after:.3f}")
     print(f"  variant_counts: {variants_after}")
     if srm_after:
         print(f"  srm: {srm_after}")
-    print(f"  stable_assignments: {stable_count} / {sum(1 for a in before.values() if a['status']=='assigned')}")
+    print(f"  stable_assignments: {stable_count} / {int(before.assigned.sum())}")
+
+    overlap = _salt_overlap(unit_ids, "salt_synth", "salt_other", layer.total_slots, 0.3)
+    print("Salt independence")
+    print(f"  overlap: {overlap} (expected ~{len(unit_ids) * 0.3 * 0.3:.0f})")
 
     session.close()
 
@@ -1 +1,3 @@
 BUCKET_SPACE = 1000
+# Traffic shares are compared and converted to slots in integer basis points
+TRAFFIC_BASIS_POINTS = 10_000
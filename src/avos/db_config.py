@@ -1,9 +1,52 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from avos.models.base import Base
+from avos.utils.hashing import DEFAULT_SLOT_HASH
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """Add columns and indexes introduced since a database was created; create_all never alters existing tables."""
+    inspector = inspect(engine)
+    if inspector.has_table("layers"):
+        if "hash_algo" not in {column["name"] for column in inspector.get_columns("layers")}:
+            # DuckDB cannot add a column with constraints; the default still fills existing rows
+            not_null = "" if engine.dialect.name == "duckdb" else " NOT NULL"
+            with engine.begin() as connection:
+                connection.execute(
+                    text(f"ALTER TABLE layers ADD COLUMN hash_algo VARCHAR{not_null} DEFAULT '{DEFAULT_SLOT_HASH}'")
+                )
+    if inspector.has_table("experiments"):
+        # Per-layer experiment lookups; create_all only indexes tables it creates itself
+        with engine.begin() as connection:
+            connection.execute(text("CREATE INDEX IF NOT EXISTS ix_experiments_layer_id ON experiments (layer_id)"))
+
+
+_session_factories: dict[str, sessionmaker] = {}
+
+
+def _session_factory(db_url: str) -> sessionmaker:
+    # Engine (and its connection pool), create_all and the schema upgrade are set up once per database URL
+    factory = _session_factories.get(db_url)
+    if factory is None:
+        engine = create_engine(db_url, echo=False, future=True)
+        Base.metadata.create_all(engine)
+        upgrade_schema(engine)
+        factory = _session_factories[db_url] = sessionmaker(bind=engine)
+    return factory
+
+
+def dispose_engines() -> None:
+    """Dispose every engine `get_session` has cached; the next call for a URL creates a fresh one."""
+    while _session_factories:
+        _, factory = _session_factories.popitem()
+        factory.kw["bind"].dispose()
 
 
 def get_session(db_url: str = "sqlite:///app.db"):
-    engine = create_engine(db_url, echo=False, future=True)
-    Base.metadata.create_all(engine)
-    return sessionmaker(bind=engine)()
+    """New session on the engine cached for `db_url`.
+
+    Sessions for the same URL share one engine and connection pool until `dispose_engines`.
+    For ``sqlite:///:memory:`` that means one shared in-memory database per thread, not a new one per call.
+    """
+    return _session_factory(db_url)()
@@ -3,6 +3,8 @@ from datetime import datetime
 from typing import List, Dict, Optional, Literal
 
 from avos.constants import BUCKET_SPACE
+from avos.utils.hashing import DEFAULT_SLOT_HASH, SLOT_HASHES
+from avos.utils.traffic import to_basis_points
 
 _ALLOC_TOLERANCE = 1e-6
 _ALLOWED_SPLITTER_TYPES = {"hash", "random", "stratified", "geo", "segment"}
@@ -19,9 +21,11 @@ def _validate_allocation_map(variants: List[str], allocation_map: Dict[str, floa
     if not isinstance(allocation_map, dict):
         raise ValueError(f"{context} must be a dict of variant to allocation")
 
-    missing = [variant for variant in variants if variant not in allocation_map]
-    extra = [variant for variant in allocation_map if variant not in variants]
-    if missing or extra:
+    # Variants are unique, so equal sizes plus no unknown key means the keys match exactly
+    variant_set = set(variants)
+    if len(allocation_map) != len(variant_set) or not variant_set.issuperset(allocation_map):
+        missing = [variant for variant in variants if variant not in allocation_map]
+        extra = [variant for variant in allocation_map if variant not in variant_set]
         raise ValueError(f"{context} keys must match variants (missing={missing}, extra={extra})")
 
     try:
@@ -29,7 +33,7 @@ def _validate_allocation_map(variants: List[str], allocation_map: Dict[str, floa
     except (TypeError, ValueError) as exc:
         raise ValueError(f"{context} values must be numeric") from exc
 
-    if any(value < 0 for value in values):
+    if min(values) < 0:
         raise ValueError(f"{context} must be non-negative")
     total = sum(values)
     if abs(total - 1.0) > _ALLOC_TOLERANCE:
@@ -84,7 +88,7 @@ class ExperimentConfig(BaseModel):
             raise ValueError("traffic_percentage must be between 0 and 1")
         if self.reserved_percentage < 0 or self.reserved_percentage > 1:
             raise ValueError("reserved_percentage must be between 0 and 1")
-        if self.reserved_percentage + _ALLOC_TOLERANCE < self.traffic_percentage:
+        if to_basis_points(self.reserved_percentage) < to_basis_points(self.traffic_percentage):
             raise ValueError("reserved_percentage must be >= traffic_percentage")
         if self.splitter_type is not None and self.splitter_type not in _ALLOWED_SPLITTER_TYPES:
             raise ValueError(f"splitter_type must be one of {sorted(_ALLOWED_SPLITTER_TYPES)}")
@@ -107,6 +111,7 @@ class LayerConfig(BaseModel):
     layer_salt: str
     total_slots: int = BUCKET_SPACE
     total_traffic_percentage: float = 1.0
+    hash_algo: str = DEFAULT_SLOT_HASH
     experiments: List[ExperimentConfig] = Field(default_factory=list)
     slots: Optional[List[LayerSlotConfig]] = None
 
@@ -114,6 +119,8 @@ class LayerConfig(BaseModel):
     def validate_layer(self):
         if self.total_slots != BUCKET_SPACE:
             raise ValueError(f"total_slots must be {BUCKET_SPACE} for fixed bucket space")
+        if self.hash_algo not in SLOT_HASHES:
+            raise ValueError(f"hash_algo must be one of {sorted(SLOT_HASHES)}")
         if self.total_traffic_percentage <= 0 or self.total_traffic_percentage > 1:
             raise ValueError("total_traffic_percentage must be between 0 and 1")
         if self.slots:
@@ -7,6 +7,7 @@ from typing import List, Dict, TYPE_CHECKING
 from sqlalchemy import String, Float, DateTime, Integer, Enum as SQLEnum, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from avos.models.base import Base
+from avos.utils import json_utils
 from avos.utils.datetime_utils import to_utc, utc_now
 
 if TYPE_CHECKING:
@@ -25,7 +26,8 @@ class Experiment(Base):
 
     # Non-default fields first (dataclass ordering rule)
     experiment_id: Mapped[str] = mapped_column(String, primary_key=True)
-    layer_id: Mapped[str] = mapped_column(String, ForeignKey("layers.layer_id"), nullable=False)
+    # Indexed: experiments are looked up per layer, and SQLite does not index foreign keys itself
+    layer_id: Mapped[str] = mapped_column(String, ForeignKey("layers.layer_id"), nullable=False, index=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     variants: Mapped[str] = mapped_column(String, nullable=False)
     traffic_allocation: Mapped[str] = mapped_column(String, nullable=False)
@@ -68,8 +70,10 @@ class Experiment(Base):
         kw["traffic_allocation"] = json.dumps(traffic_allocation)
         kw["start_date"] = to_utc(start_date)
         kw["end_date"] = to_utc(end_date)
-        kw["created_at"] = to_utc(created_at) or utc_now()
-        kw["updated_at"] = to_utc(updated_at) or utc_now()
+        # One clock read shared by both defaults, so a new experiment starts with created_at == updated_at
+        now = utc_now()
+        kw["created_at"] = to_utc(created_at) or now
+        kw["updated_at"] = to_utc(updated_at) or now
         if "reserved_percentage" not in kw or kw["reserved_percentage"] is None:
             kw["reserved_percentage"] = kw.get("traffic_percentage", 1.0)
         if "segment_allocations" in kw and kw["segment_allocations"] is not None:
@@ -84,21 +88,47 @@ class Experiment(Base):
 
         super().__init__(**kw)
 
+        # The decoded values are already in hand; seed the parse cache when JSON would round-trip them as-is
+        if isinstance(variants, list) and all(isinstance(variant, str) for variant in variants):
+            self._store_json("variants", kw["variants"], list(variants))
+        if isinstance(traffic_allocation, dict) and all(isinstance(key, str) for key in traffic_allocation):
+            self._store_json("traffic_allocation", kw["traffic_allocation"], dict(traffic_allocation))
+
     # Helper methods
+    def _store_json(self, column: str, raw: str, value) -> None:
+        # Plain instance attribute, not a mapped column; rows loaded from the database start without it
+        self.__dict__.setdefault("_json_cache", {})[column] = (raw, value)
+
+    def _load_json(self, column: str, raw: str):
+        """json.loads of a JSON column, reused until the column's string changes."""
+        cached = self.__dict__.get("_json_cache", {}).get(column)
+        if cached is None or cached[0] != raw:
+            cached = (raw, json_utils.loads(raw))
+            self._store_json(column, raw, cached[1])
+        return cached[1]
+
+    def _load_allocation_map(self, column: str) -> dict:
+        raw = getattr(self, column)
+        if not raw:
+            return {}
+        # Two-level copy: {key: {variant: allocation}}
+        return {key: dict(allocations) for key, allocations in self._load_json(column, raw).items()}
+
     def get_variant_list(self) -> List[str]:
-        return json.loads(self.variants)
+        # Copies, so callers can never mutate the cached parse
+        return list(self._load_json("variants", self.variants))
 
     def get_traffic_dict(self) -> Dict[str, float]:
-        return json.loads(self.traffic_allocation)
+        return dict(self._load_json("traffic_allocation", self.traffic_allocation))
 
     def get_segment_allocations(self) -> dict:
-        return json.loads(self.segment_allocations) if self.segment_allocations else {}
+        return self._load_allocation_map("segment_allocations")
 
     def get_geo_allocations(self) -> dict:
-        return json.loads(self.geo_allocations) if self.geo_allocations else {}
+        return self._load_allocation_map("geo_allocations")
 
     def get_stratum_allocations(self) -> dict:
-        return json.loads(self.stratum_allocations) if self.stratum_allocations else {}
+        return self._load_allocation_map("stratum_allocations")
 
     def is_active(self, now: datetime | None = None) -> bool:
         """Check if experiment is active at the given time (UTC)."""
@@ -8,6 +8,7 @@ from sqlalchemy.orm import relationship, Mapped, mapped_column
 from avos.constants import BUCKET_SPACE
 from avos.models.base import Base
 from avos.utils.datetime_utils import utc_now
+from avos.utils.hashing import DEFAULT_SLOT_HASH
 
 if TYPE_CHECKING:
     from avos.models.experiment import Experiment
@@ -21,6 +22,7 @@ class Layer(Base):
 
     total_slots: Mapped[int] = mapped_column(Integer, default=BUCKET_SPACE)
     total_traffic_percentage: Mapped[float] = mapped_column(Float, default=1.0)
+    hash_algo: Mapped[str] = mapped_column(String, default=DEFAULT_SLOT_HASH)
 
     # UTC timezone-aware timestamps
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default_factory=utc_now)
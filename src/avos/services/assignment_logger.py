@@ -1,6 +1,9 @@
 import duckdb
+import queue
+import threading
+import time
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import os  # For environment variable handling
 
 
@@ -21,57 +24,90 @@ def _initialize_table(con) -> None:
     )
 
 
+# Every assignment carries the required columns; unassigned units leave the optional ones out or None
+_REQUIRED_COLUMNS = ("unit_id", "layer_id", "slot_index", "status")
+_OPTIONAL_COLUMNS = ("experiment_id", "experiment_name", "variant")
+
+
 def _log_assignments(con, assignments: List[Dict[str, Any]]) -> None:
-    records = []
-    now = datetime.now(timezone.utc)
-    for assignment in assignments:
-        records.append(
-            (
-                assignment["unit_id"],
-                assignment["layer_id"],
-                assignment["slot_index"],
-                assignment.get("experiment_id"),
-                assignment.get("experiment_name"),
-                assignment.get("variant"),
-                assignment["status"],
-                now,
-            )
-        )
-    con.executemany(
+    if not assignments:
+        return
+    # Column-wise lists are unnested in a single INSERT ... SELECT, so DuckDB ingests
+    # the whole batch vectorized instead of binding one parameter row at a time.
+    columns = {name: [assignment[name] for assignment in assignments] for name in _REQUIRED_COLUMNS}
+    columns.update({name: [assignment.get(name) for assignment in assignments] for name in _OPTIONAL_COLUMNS})
+    con.execute(
         """
         INSERT INTO user_assignments
         (unit_id, layer_id, slot_index, experiment_id, experiment_name, variant, status, assignment_timestamp)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        SELECT
+            UNNEST($unit_id), UNNEST($layer_id), UNNEST($slot_index), UNNEST($experiment_id),
+            UNNEST($experiment_name), UNNEST($variant), UNNEST($status), $assignment_timestamp
         """,
-        records,
+        {**columns, "assignment_timestamp": datetime.now(timezone.utc)},
     )
 
 
-class LocalAssignmentLogger:
-    def __init__(self, db_path: str = "avos_assignments.duckdb"):
-        self.con = duckdb.connect(db_path)
-        _initialize_table(self.con)
+_VARIANT_COUNTS_SQL = """
+    SELECT experiment_id, variant, COUNT(*) AS count
+    FROM user_assignments
+    WHERE experiment_id = ? AND status = 'assigned'
+    GROUP BY experiment_id, variant
+    ORDER BY count DESC
+"""
+
+_STATUS_BREAKDOWN_SQL = """
+    SELECT status, COUNT(*) AS count
+    FROM user_assignments
+    GROUP BY status
+"""
+
+_RECENT_ASSIGNMENTS_SQL = """
+    SELECT unit_id, experiment_id, variant, assignment_timestamp
+    FROM user_assignments
+    WHERE status = 'assigned'
+    ORDER BY assignment_timestamp DESC
+    LIMIT ?
+"""
+
+
+class _DuckDBAssignmentLogger:
+    """Shared logging and reporting over a DuckDB `user_assignments` table."""
+
+    con: duckdb.DuckDBPyConnection
 
     def log_assignments(self, assignments: List[Dict[str, Any]]):
         _log_assignments(self.con, assignments)
 
+    def report_variants(self, experiment_id: str) -> List[Tuple]:
+        """(experiment_id, variant, count) of assigned units, largest first."""
+        return self.con.execute(_VARIANT_COUNTS_SQL, [experiment_id]).fetchall()
+
+    def report_status(self) -> List[Tuple]:
+        """(status, count) across all logged assignments."""
+        return self.con.execute(_STATUS_BREAKDOWN_SQL).fetchall()
+
+    def report_recent(self, limit: int = 5) -> List[Tuple]:
+        """(unit_id, experiment_id, variant, assignment_timestamp) of the latest assigned units."""
+        return self.con.execute(_RECENT_ASSIGNMENTS_SQL, [limit]).fetchall()
+
     def close(self):
         self.con.close()
 
 
-class InMemoryAssignmentLogger:
-    def __init__(self):
-        self.con = duckdb.connect(":memory:")
+class LocalAssignmentLogger(_DuckDBAssignmentLogger):
+    def __init__(self, db_path: str = "avos_assignments.duckdb"):
+        self.con = duckdb.connect(db_path)
         _initialize_table(self.con)
 
-    def log_assignments(self, assignments: List[Dict[str, Any]]):
-        _log_assignments(self.con, assignments)
 
-    def close(self):
-        self.con.close()
+class InMemoryAssignmentLogger(_DuckDBAssignmentLogger):
+    def __init__(self):
+        self.con = duckdb.connect(":memory:")
+        _initialize_table(self.con)
 
 
-class MotherDuckAssignmentLogger:
+class MotherDuckAssignmentLogger(_DuckDBAssignmentLogger):
     def __init__(self, db_name: str = "avos_db", token: str = None):
         # Set up authentication (use env var for security in production)
         if token is None:
@@ -84,8 +120,113 @@ class MotherDuckAssignmentLogger:
 
         _initialize_table(self.con)
 
+
+_STOP = object()
+
+
+class AsyncAssignmentLogger:
+    """Wraps another assignment logger so `log_assignments` only enqueues.
+
+    A background thread drains the queue and writes everything pending as one batch, so
+    single-unit assignments never wait on the database (or on MotherDuck's network round trip).
+    With `flush_interval` > 0 it also waits up to that many seconds for a batch to fill to
+    `max_batch_size` before writing, trading latency for larger inserts under light traffic.
+    `flush()` waits for pending writes and re-raises a failed one; reports flush first.
+    The wrapped logger is only used under a lock: DuckDB connections are not safe to share between
+    the worker's writes and reports run on caller threads.
+    """
+
+    def __init__(
+        self,
+        logger,
+        max_pending_batches: int = 10_000,
+        max_batch_size: int = 10_000,
+        flush_interval: float = 0.0,
+    ):
+        self.logger = logger
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        # Bounded, so a stalled database applies backpressure instead of growing memory
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending_batches)
+        self._error = None
+        self._closed = False
+        # Held across the closed check and the put, so no batch can be queued behind the stop marker
+        self._state_lock = threading.Lock()
+        self._logger_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._drain, name="avos-assignment-logger", daemon=True)
+        self._thread.start()
+
     def log_assignments(self, assignments: List[Dict[str, Any]]):
-        _log_assignments(self.con, assignments)
+        with self._state_lock:
+            if self._closed:
+                raise RuntimeError("AsyncAssignmentLogger is closed")
+            if assignments:
+                self._queue.put(list(assignments))
+
+    def _drain(self):
+        stopping = False
+        while not stopping:
+            batches = [self._queue.get()]
+            size = len(batches[0]) if batches[0] is not _STOP else 0
+            deadline = time.monotonic() + self.flush_interval
+            # Coalesce whatever else is waiting (or arrives before the deadline) into the same write
+            while size < self.max_batch_size and batches[-1] is not _STOP:
+                timeout = deadline - time.monotonic()
+                try:
+                    batch = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batches.append(batch)
+                if batch is not _STOP:
+                    size += len(batch)
+            stopping = batches[-1] is _STOP
+            rows = [assignment for batch in batches if batch is not _STOP for assignment in batch]
+            try:
+                if rows:
+                    with self._logger_lock:
+                        self.logger.log_assignments(rows)
+            except Exception as exc:
+                self._error = exc
+            finally:
+                for _ in batches:
+                    self._queue.task_done()
+
+    def flush(self):
+        """Block until every enqueued assignment is written; raise the last write error, if any."""
+        if self._closed:
+            raise RuntimeError("AsyncAssignmentLogger is closed")
+        self._queue.join()
+        self._raise_error()
+
+    def _raise_error(self):
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def report_variants(self, experiment_id: str) -> List[Tuple]:
+        self.flush()
+        with self._logger_lock:
+            return self.logger.report_variants(experiment_id)
+
+    def report_status(self) -> List[Tuple]:
+        self.flush()
+        with self._logger_lock:
+            return self.logger.report_status()
+
+    def report_recent(self, limit: int = 5) -> List[Tuple]:
+        self.flush()
+        with self._logger_lock:
+            return self.logger.report_recent(limit)
 
     def close(self):
-        self.con.close()
+        """Write what is pending, stop the thread and close the wrapped logger."""
+        with self._state_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+        try:
+            self._raise_error()
+        finally:
+            self.logger.close()
@@ -1,6 +1,9 @@
 from __future__ import annotations
-import hashlib
-from typing import Dict, Any, List, Optional
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Sequence, TypeGuard
+
+import numpy as np
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from avos.models.layer import Layer, LayerSlot
@@ -15,6 +18,11 @@ from avos.services.splitter import (
     normalize_allocations,
 )
 from avos.utils.datetime_utils import utc_now
+from avos.utils.hashing import DEFAULT_SLOT_HASH, get_slot_hash
+
+
+# Bulk batches with fewer than total_slots / ratio units look up only their own slots
+_SLOT_LOOKUP_FULL_TABLE_RATIO = 4
 
 
 class AssignmentService:
@@ -30,111 +38,169 @@ class AssignmentService:
         stratum: Optional[str] = None,
         assignment_logger: Optional[Any] = None,
     ) -> Dict[str, Any]:
-        slot_index = AssignmentService._calculate_user_slot(layer.layer_salt, layer.total_slots, unit_id)
-        slot = session.execute(
-            select(LayerSlot).where(LayerSlot.layer_id == layer.layer_id, LayerSlot.slot_index == slot_index)
-        ).scalar_one_or_none()
-        if not slot or not slot.experiment_id:
-            assignment = AssignmentService._make_assignment(
-                unit_id, layer, slot_index, None, None, "not_assigned", None
-            )
-            AssignmentService._log_assignments(assignment_logger, [assignment])
-            return assignment
-
-        experiment = session.get(Experiment, slot.experiment_id)
-        if not experiment or not experiment.is_active(utc_now()):
-            assignment = AssignmentService._make_assignment(
-                unit_id,
-                layer,
-                slot_index,
-                slot.experiment_id,
-                None,
-                "experiment_inactive",
-                experiment.name if experiment else None,
-            )
-            AssignmentService._log_assignments(assignment_logger, [assignment])
-            return assignment
-
-        splitter = AssignmentService._select_splitter(
-            experiment.splitter_type or "hash", experiment, segment, geo, stratum
+        slot_index = AssignmentService._calculate_user_slot(
+            layer.layer_salt, layer.total_slots, unit_id, layer.hash_algo
         )
-        splitter_kwargs = {}
-        if segment:
-            splitter_kwargs["segment"] = segment
-        if geo:
-            splitter_kwargs["geo"] = geo
-        if stratum:
-            splitter_kwargs["stratum"] = stratum
-
-        variants = experiment.get_variant_list()
-        allocations = normalize_allocations(variants, experiment.get_traffic_dict(), context="traffic_allocation")
-        variant = splitter.assign_variant(unit_id, variants, allocations, **splitter_kwargs)
-        assignment = AssignmentService._make_assignment(
-            unit_id, layer, slot_index, experiment.experiment_id, variant, "assigned", experiment.name
+        slot = session.get(LayerSlot, (layer.layer_id, slot_index))
+        experiment_id = slot.experiment_id if slot else None
+        experiment = session.get(Experiment, experiment_id) if experiment_id else None
+        assignment = AssignmentService._assign_from_slot(
+            unit_id, layer.layer_id, slot_index, experiment_id, experiment, utc_now(), segment, geo, stratum
         )
         AssignmentService._log_assignments(assignment_logger, [assignment])
         return assignment
 
+    @staticmethod
+    def calculate_slots(layer: Layer, unit_ids: Sequence[str | int] | np.ndarray) -> np.ndarray:
+        """Slot index of every unit in `layer`, hashed as one batch; no database access."""
+        return AssignmentService._calculate_user_slots(layer.layer_salt, layer.total_slots, unit_ids, layer.hash_algo)
+
     @staticmethod
     def assign_bulk_for_layer(
         session: Session,
         layer: Layer,
-        unit_ids: List[str | int],
+        unit_ids: Sequence[str | int] | np.ndarray,
         segment: Optional[str] = None,
         geo: Optional[str] = None,
         stratum: Optional[str] = None,
         assignment_logger: Optional[Any] = None,
+        slot_indices: Optional[np.ndarray] = None,
     ) -> Dict[str | int, Dict[str, Any]]:
-        """Bulk-assign for many users."""
+        """Bulk-assign for many users.
+
+        Slots are hashed for the whole batch at once and resolved against the layer's slot
+        table in numpy; experiments are loaded with one query instead of two queries per user.
+        `unit_ids` may also be a numpy bytes array (dtype ``S``) of UTF-8 ids, which is hashed
+        without re-encoding; the result is then keyed by the decoded ids.
+        Slots only depend on the layer's salt and hash, so `slot_indices` from an earlier
+        `calculate_slots(layer, unit_ids)` can be passed to skip hashing when re-assigning.
+        Duplicate ids are hashed and assigned once; the result has one entry per distinct id.
+        """
+        if slot_indices is not None and len(slot_indices) != len(unit_ids):
+            raise ValueError("slot_indices must have one entry per unit_id")
+        # Duplicate ids share one assignment, so each distinct id is hashed and assigned once
+        first_positions = AssignmentService._first_occurrences(unit_ids)
+        if first_positions is not None:
+            if AssignmentService._is_byte_ids(unit_ids):
+                unit_ids = unit_ids[first_positions]
+            else:
+                unit_ids = [unit_ids[i] for i in first_positions]
+            if slot_indices is not None:
+                slot_indices = np.asarray(slot_indices)[first_positions]
+        if slot_indices is None:
+            slot_indices = AssignmentService.calculate_slots(layer, unit_ids)
+        slot_indices = np.asarray(slot_indices, dtype=np.int64)
+        unit_ids = AssignmentService._decode_unit_ids(unit_ids)
+        # Batches much smaller than the layer only fetch the slots they hash to; larger ones read
+        # the whole (bounded) slot table, which is cheaper than a long IN list
+        if len(slot_indices) * _SLOT_LOOKUP_FULL_TABLE_RATIO < layer.total_slots:
+            experiment_ids, slot_table = AssignmentService._load_slot_table(
+                session, layer, np.unique(slot_indices).tolist()
+            )
+        else:
+            experiment_ids, slot_table = AssignmentService._load_slot_table(session, layer)
+        owners = slot_table[slot_indices]
+
+        experiments: Dict[str, Experiment] = {}
+        if experiment_ids:
+            rows = session.execute(select(Experiment).where(Experiment.experiment_id.in_(experiment_ids))).scalars()
+            experiments = {experiment.experiment_id: experiment for experiment in rows.all()}
+
+        now = utc_now()
+        # Activity only depends on `now`, so it is checked once per experiment rather than once per unit
+        active = {experiment_id for experiment_id, experiment in experiments.items() if experiment.is_active(now)}
+        # Active hash-split experiments get their variants in one splitter pass per experiment;
+        # free slots, inactive experiments and context-dependent splitters go unit by unit
+        batched = {
+            experiment_id
+            for experiment_id in active
+            if (experiments[experiment_id].splitter_type or "hash") == "hash" and not (segment or geo or stratum)
+        }
+        # Splitters and parsed allocations are built once per experiment, not once per unit
+        plans: Dict[str, tuple] = {}
+        pending: Dict[str, List[str | int]] = {}
         assignments = {}
-        for uid in unit_ids:
-            assignment = AssignmentService.assign_for_layer(
-                session,
-                layer,
+        # ORM attribute reads cost several dict lookups each, so per-unit values are read once here
+        layer_id = layer.layer_id
+        names = {experiment_id: experiments[experiment_id].name for experiment_id in batched}
+        for uid, slot_index, owner in zip(unit_ids, slot_indices.tolist(), owners.tolist()):
+            experiment_id = experiment_ids[owner] if owner >= 0 else None
+            if experiment_id in batched:
+                assignments[uid] = AssignmentService._make_assignment(
+                    uid, layer_id, slot_index, experiment_id, None, "assigned", names[experiment_id]
+                )
+                pending.setdefault(experiment_id, []).append(uid)
+                continue
+            assignments[uid] = AssignmentService._assign_from_slot(
                 uid,
-                segment=segment,
-                geo=geo,
-                stratum=stratum,
-                assignment_logger=None,
+                layer_id,
+                slot_index,
+                experiment_id,
+                experiments.get(experiment_id) if experiment_id else None,
+                now,
+                segment,
+                geo,
+                stratum,
+                plans,
+                experiment_id in active,
             )
-            assignments[uid] = assignment
-        AssignmentService._log_assignments(assignment_logger, list(assignments.values()))
+        for experiment_id, pending_ids in pending.items():
+            splitter, variants, allocations, _ = AssignmentService._experiment_plan(
+                experiments[experiment_id], segment, geo, stratum
+            )
+            for uid, variant in zip(pending_ids, splitter.assign_variants(pending_ids, variants, allocations)):
+                assignments[uid]["variant"] = variant
+        if assignment_logger is not None:
+            AssignmentService._log_assignments(assignment_logger, list(assignments.values()))
         return assignments
 
     @staticmethod
     def preview_assignment_distribution(
         session: Session,
         layer: Layer,
-        sample_unit_ids: List[str | int],
+        sample_unit_ids: Sequence[str | int] | np.ndarray,
         segment: Optional[str] = None,
         geo: Optional[str] = None,
         stratum: Optional[str] = None,
     ) -> Dict[str, Any]:
         """Preview experiment/variant distribution for SRM monitoring and slot QA."""
-        distribution = {}
-        unassigned_count = 0
-        for uid in sample_unit_ids:
-            assignment = AssignmentService.assign_for_layer(
-                session, layer, uid, segment=segment, geo=geo, stratum=stratum
+        sample_unit_ids = AssignmentService._decode_unit_ids(sample_unit_ids)
+        assignments = AssignmentService.assign_bulk_for_layer(
+            session, layer, sample_unit_ids, segment=segment, geo=geo, stratum=stratum
+        )
+        return AssignmentService._summarize_distribution(sample_unit_ids, assignments)
+
+    @staticmethod
+    def preview_assignment_distribution_multi(
+        session: Session,
+        layers: Sequence[Layer],
+        sample_unit_ids: Sequence[str | int] | np.ndarray,
+        segment: Optional[str] = None,
+        geo: Optional[str] = None,
+        stratum: Optional[str] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """`preview_assignment_distribution` for several layers over one sample, keyed by layer_id.
+
+        Unit ids are converted to str once and that list is shared by every layer's batch. Slots
+        depend on each layer's salt, so every layer still encodes, dedups and hashes the ids itself.
+        """
+        if AssignmentService._is_byte_ids(sample_unit_ids):
+            unit_keys = AssignmentService._decode_unit_ids(sample_unit_ids)
+        else:
+            unit_keys = [str(uid) for uid in sample_unit_ids]
+        previews = {}
+        for layer in layers:
+            assignments = AssignmentService.assign_bulk_for_layer(
+                session, layer, unit_keys, segment=segment, geo=geo, stratum=stratum
             )
-            if assignment["status"] == "assigned":
-                key = f"{assignment['experiment_id']}:{assignment['variant']}"
-                distribution[key] = distribution.get(key, 0) + 1
-            else:
-                unassigned_count += 1
-        total = len(sample_unit_ids)
-        return {
-            "total_users": total,
-            "assignment_distribution": distribution,
-            "unassigned_count": unassigned_count,
-            "assignment_rate": ((total - unassigned_count) / total * 100) if total else None,
-        }
+            previews[layer.layer_id] = AssignmentService._summarize_distribution(unit_keys, assignments)
+        return previews
 
     @staticmethod
     def preview_assignment_metrics(
         session: Session,
         layer: Layer,
-        sample_unit_ids: List[str | int],
+        sample_unit_ids: Sequence[str | int] | np.ndarray,
         segment: Optional[str] = None,
         geo: Optional[str] = None,
         stratum: Optional[str] = None,
@@ -157,10 +223,97 @@ class AssignmentService:
         return result
 
     @staticmethod
-    def _make_assignment(unit_id, layer, slot_index, experiment_id, variant, status, experiment_name):
+    def _assign_from_slot(
+        unit_id: str | int,
+        layer_id: str,
+        slot_index: int,
+        experiment_id: Optional[str],
+        experiment: Optional[Experiment],
+        now: datetime,
+        segment: Optional[str],
+        geo: Optional[str],
+        stratum: Optional[str],
+        plans: Optional[Dict[str, tuple]] = None,
+        active: Optional[bool] = None,
+    ) -> Dict[str, Any]:
+        if not experiment_id:
+            return AssignmentService._make_assignment(unit_id, layer_id, slot_index, None, None, "not_assigned", None)
+
+        if active is None:
+            active = experiment is not None and experiment.is_active(now)
+        if not experiment or not active:
+            return AssignmentService._make_assignment(
+                unit_id,
+                layer_id,
+                slot_index,
+                experiment_id,
+                None,
+                "experiment_inactive",
+                experiment.name if experiment else None,
+            )
+
+        plan = plans.get(experiment_id) if plans is not None else None
+        if plan is None:
+            plan = AssignmentService._experiment_plan(experiment, segment, geo, stratum)
+            if plans is not None:
+                plans[experiment_id] = plan
+        splitter, variants, allocations, splitter_kwargs = plan
+        variant = splitter.assign_variant(unit_id, variants, allocations, **splitter_kwargs)
+        return AssignmentService._make_assignment(
+            unit_id, layer_id, slot_index, experiment_id, variant, "assigned", experiment.name
+        )
+
+    @staticmethod
+    def _experiment_plan(
+        experiment: Experiment, segment: Optional[str], geo: Optional[str], stratum: Optional[str]
+    ) -> tuple:
+        """Splitter, variants, allocations and splitter kwargs: everything per-unit assignment reuses."""
+        splitter = AssignmentService._select_splitter(
+            experiment.splitter_type or "hash", experiment, segment, geo, stratum
+        )
+        splitter_kwargs = {}
+        if segment:
+            splitter_kwargs["segment"] = segment
+        if geo:
+            splitter_kwargs["geo"] = geo
+        if stratum:
+            splitter_kwargs["stratum"] = stratum
+
+        variants = experiment.get_variant_list()
+        allocations = normalize_allocations(variants, experiment.get_traffic_dict(), context="traffic_allocation")
+        return splitter, variants, allocations, splitter_kwargs
+
+    @staticmethod
+    def _summarize_distribution(
+        sample_unit_ids: Sequence[str | int], assignments: Dict[str | int, Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        pair_counts = AssignmentService._count_assigned_pairs(sample_unit_ids, assignments)
+        distribution = {f"{experiment_id}:{variant}": count for (experiment_id, variant), count in pair_counts.items()}
+        total = len(sample_unit_ids)
+        unassigned_count = total - sum(pair_counts.values())
+        return {
+            "total_users": total,
+            "assignment_distribution": distribution,
+            "unassigned_count": unassigned_count,
+            "assignment_rate": ((total - unassigned_count) / total * 100) if total else None,
+        }
+
+    @staticmethod
+    def _count_assigned_pairs(
+        sample_unit_ids: Sequence[str | int], assignments: Dict[str | int, Dict[str, Any]]
+    ) -> Counter:
+        # Count (experiment, variant) pairs in C; callers format "exp:variant" keys once per pair
+        return Counter(
+            (assignment["experiment_id"], assignment["variant"])
+            for assignment in map(assignments.__getitem__, sample_unit_ids)
+            if assignment["status"] == "assigned"
+        )
+
+    @staticmethod
+    def _make_assignment(unit_id, layer_id, slot_index, experiment_id, variant, status, experiment_name):
         return {
             "unit_id": str(unit_id),
-            "layer_id": layer.layer_id,
+            "layer_id": layer_id,
             "slot_index": slot_index,
             "experiment_id": experiment_id,
             "experiment_name": experiment_name,
@@ -184,12 +337,95 @@ class AssignmentService:
             raise ValueError(f"Unknown splitter type: {splitter_type}")
 
     @staticmethod
-    def _calculate_user_slot(layer_salt: str, total_slots: int, unit_id: str | int) -> int:
+    def _calculate_user_slot(
+        layer_salt: str, total_slots: int, unit_id: str | int, hash_algo: str = DEFAULT_SLOT_HASH
+    ) -> int:
         hash_input = f"{unit_id}{layer_salt}".encode("utf-8")
-        digest = hashlib.md5(hash_input).hexdigest()
-        hash_value = int(digest, 16)
+        # Big-endian digest as an integer; for md5 this equals int(hexdigest, 16)
+        hash_value = int.from_bytes(get_slot_hash(hash_algo)(hash_input), "big")
         return hash_value % total_slots
 
+    @staticmethod
+    def _calculate_user_slots(
+        layer_salt: str,
+        total_slots: int,
+        unit_ids: Sequence[str | int] | np.ndarray,
+        hash_algo: str = DEFAULT_SLOT_HASH,
+    ) -> np.ndarray:
+        """Vectorized `_calculate_user_slot`: same slots, one numpy reduction for the whole batch."""
+        digest = get_slot_hash(hash_algo)
+        if len(unit_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        salt = layer_salt.encode("utf-8")
+        if AssignmentService._is_byte_ids(unit_ids):
+            keys = unit_ids.tolist()
+        else:
+            keys = [f"{uid}".encode("utf-8") for uid in unit_ids]
+        digests = b"".join(digest(key + salt) for key in keys)
+        # Each digest as big-endian 64-bit words, most significant first
+        words = np.frombuffer(digests, dtype=">u8").reshape(len(unit_ids), -1).astype(np.uint64)
+        modulus = np.uint64(total_slots)
+        # Horner's rule modulo total_slots; stays within uint64 while total_slots < 2**32
+        word_weight = np.uint64(pow(2, 64, total_slots))
+        slots = np.zeros(len(unit_ids), dtype=np.uint64)
+        for column in words.T:
+            slots = (slots * word_weight + column % modulus) % modulus
+        return slots.astype(np.int64)
+
+    @staticmethod
+    def _is_byte_ids(unit_ids: object) -> TypeGuard[np.ndarray]:
+        return isinstance(unit_ids, np.ndarray) and unit_ids.dtype.kind == "S"
+
+    @staticmethod
+    def _first_occurrences(unit_ids) -> Optional[List[int]]:
+        """Positions of the first occurrence of each distinct id, in order; None if all ids are distinct."""
+        if AssignmentService._is_byte_ids(unit_ids):
+            _, first = np.unique(unit_ids, return_index=True)
+            return np.sort(first).tolist() if len(first) < len(unit_ids) else None
+        # A set build is the cheap check for the common all-distinct case
+        if len(set(unit_ids)) == len(unit_ids):
+            return None
+        positions: Dict[str | int, int] = {}
+        for position, uid in enumerate(unit_ids):
+            positions.setdefault(uid, position)
+        return list(positions.values())
+
+    @staticmethod
+    def _decode_unit_ids(unit_ids: Sequence[str | int] | np.ndarray) -> Sequence[str | int]:
+        """Unit ids as a Python sequence: byte-string arrays decode to str, other arrays become lists."""
+        if AssignmentService._is_byte_ids(unit_ids):
+            return np.char.decode(unit_ids, "utf-8").tolist()
+        if isinstance(unit_ids, np.ndarray):
+            return unit_ids.tolist()
+        return unit_ids
+
+    @staticmethod
+    def _load_slot_table(
+        session: Session, layer: Layer, slot_indices: Optional[List[int]] = None
+    ) -> tuple[List[str], np.ndarray]:
+        """Layer's slot owners as an int32 array indexed by slot_index.
+
+        Entries index into the returned experiment id list; -1 marks a slot with no experiment.
+        With `slot_indices`, only those slots are read and every other entry is left at -1.
+        """
+        stmt = select(LayerSlot.slot_index, LayerSlot.experiment_id).where(
+            LayerSlot.layer_id == layer.layer_id, LayerSlot.experiment_id.is_not(None)
+        )
+        if slot_indices is not None:
+            stmt = stmt.where(LayerSlot.slot_index.in_(slot_indices))
+        # The statement already excludes unowned slots; the filter narrows the column type for callers
+        rows = [
+            (slot_index, experiment_id)
+            for slot_index, experiment_id in session.execute(stmt).all()
+            if experiment_id is not None
+        ]
+        experiment_ids = sorted({experiment_id for _, experiment_id in rows})
+        positions = {experiment_id: i for i, experiment_id in enumerate(experiment_ids)}
+        slot_table = np.full(layer.total_slots, -1, dtype=np.int32)
+        for slot_index, experiment_id in rows:
+            slot_table[slot_index] = positions[experiment_id]
+        return experiment_ids, slot_table
+
     @staticmethod
     def _log_assignments(assignment_logger: Optional[Any], assignments: List[Dict[str, Any]]) -> None:
         if assignment_logger is None or not assignments:
@@ -203,27 +439,23 @@ class AssignmentService:
     def _collect_assignment_stats(
         session: Session,
         layer: Layer,
-        sample_unit_ids: List[str | int],
+        sample_unit_ids: Sequence[str | int] | np.ndarray,
         segment: Optional[str] = None,
         geo: Optional[str] = None,
         stratum: Optional[str] = None,
     ):
+        # One bulk pass (two queries) instead of an assign_for_layer round trip per sampled unit
+        sample_unit_ids = AssignmentService._decode_unit_ids(sample_unit_ids)
+        assignments = AssignmentService.assign_bulk_for_layer(
+            session, layer, sample_unit_ids, segment=segment, geo=geo, stratum=stratum
+        )
+        pair_counts = AssignmentService._count_assigned_pairs(sample_unit_ids, assignments)
         distribution: Dict[str, int] = {}
-        unassigned_count = 0
         per_experiment_counts: Dict[str, Dict[str, int]] = {}
-        for uid in sample_unit_ids:
-            assignment = AssignmentService.assign_for_layer(
-                session, layer, uid, segment=segment, geo=geo, stratum=stratum
-            )
-            if assignment["status"] == "assigned":
-                exp_id = assignment["experiment_id"]
-                variant = assignment["variant"]
-                key = f"{exp_id}:{variant}"
-                distribution[key] = distribution.get(key, 0) + 1
-                exp_counts = per_experiment_counts.setdefault(exp_id, {})
-                exp_counts[variant] = exp_counts.get(variant, 0) + 1
-            else:
-                unassigned_count += 1
+        for (exp_id, variant), count in pair_counts.items():
+            distribution[f"{exp_id}:{variant}"] = count
+            per_experiment_counts.setdefault(exp_id, {})[variant] = count
+        unassigned_count = len(sample_unit_ids) - sum(pair_counts.values())
         return distribution, per_experiment_counts, unassigned_count
 
     @staticmethod
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import math
 from sqlalchemy import select, func
 from sqlalchemy.orm import Session
 
@@ -10,6 +9,7 @@ from avos.models.experiment import Experiment, ExperimentStatus
 from avos.models.layer import LayerSlot
 from avos.services.layer_service import LayerService
 from avos.utils.datetime_utils import to_utc
+from avos.utils.traffic import slots_for_share, to_basis_points
 
 
 def apply_layer_configs(session: Session, layer_configs: list[LayerConfig]) -> None:
@@ -29,26 +29,44 @@ def _apply_layer_config(session: Session, layer_config: LayerConfig) -> None:
             layer_salt=layer_config.layer_salt,
             total_slots=layer_config.total_slots,
             total_traffic_percentage=layer_config.total_traffic_percentage,
+            hash_algo=layer_config.hash_algo,
         )
     else:
         if layer.layer_salt != layer_config.layer_salt:
             raise ValueError(f"layer_salt mismatch for layer {layer_config.layer_id}")
+        # Like the salt, changing the slot hash would re-bucket every unit in the layer
+        if layer.hash_algo != layer_config.hash_algo:
+            raise ValueError(f"hash_algo mismatch for layer {layer_config.layer_id}")
         if layer.total_slots != layer_config.total_slots:
             raise ValueError(f"total_slots mismatch for layer {layer_config.layer_id}")
         if layer.total_traffic_percentage != layer_config.total_traffic_percentage:
             layer.total_traffic_percentage = layer_config.total_traffic_percentage
             session.commit()
 
+    # Every configured experiment that already exists, from one IN query rather than a lookup per id
+    experiments_by_id = {
+        experiment.experiment_id: experiment
+        for experiment in session.execute(
+            select(Experiment).where(
+                Experiment.experiment_id.in_([experiment.experiment_id for experiment in layer_config.experiments])
+            )
+        ).scalars()
+    }
     for experiment_config in layer_config.experiments:
         if experiment_config.layer_id != layer_config.layer_id:
             raise ValueError(
                 f"experiment {experiment_config.experiment_id} layer_id does not match layer {layer_config.layer_id}"
             )
-        _apply_experiment_config(session, layer, experiment_config)
+        existing = experiments_by_id.get(experiment_config.experiment_id)
+        experiment = _apply_experiment_config(session, layer, experiment_config, existing)
+        if experiment is not None:
+            experiments_by_id[experiment_config.experiment_id] = experiment
 
 
-def _apply_experiment_config(session: Session, layer, experiment_config: ExperimentConfig) -> None:
-    existing = LayerService.get_experiment(session, experiment_config.experiment_id)
+def _apply_experiment_config(
+    session: Session, layer, experiment_config: ExperimentConfig, existing: Experiment | None
+) -> Experiment | None:
+    """Create, update or complete one experiment; returns the experiment it created, if any."""
     if experiment_config.status == "completed":
         if existing:
             if existing.layer_id != experiment_config.layer_id:
@@ -78,24 +96,27 @@ def _apply_experiment_config(session: Session, layer, experiment_config: Experim
                     "create a new experiment"
                 )
             LayerService.remove_experiment(session, layer, experiment_config.experiment_id)
-        return
+        return None
 
     if existing is None:
         experiment = _build_experiment(experiment_config)
         success = LayerService.add_experiment(session, layer, experiment)
         if not success:
             raise ValueError(f"failed to add experiment {experiment_config.experiment_id} to layer {layer.layer_id}")
-        return
+        return experiment
 
     if existing.status == ExperimentStatus.COMPLETED:
         raise ValueError(f"experiment {experiment_config.experiment_id} is completed and cannot be modified")
     _validate_experiment_immutables(existing, experiment_config)
     _validate_traffic_percentage_change(existing, experiment_config)
     _validate_reserved_percentage_change(session, layer, existing, experiment_config)
-    _apply_reservation_slots(session, layer, existing, experiment_config)
-    _apply_ramp_up_slots(session, layer, existing, experiment_config)
-    _update_experiment(existing, experiment_config)
-    session.commit()
+    reserved = _apply_reservation_slots(session, layer, existing, experiment_config)
+    ramped = _apply_ramp_up_slots(session, layer, existing, experiment_config)
+    updated = _update_experiment(existing, experiment_config)
+    # A resync of an unchanged experiment has nothing to write, so it skips the commit
+    if reserved or ramped or updated:
+        session.commit()
+    return None
 
 
 def _build_experiment(experiment_config: ExperimentConfig) -> Experiment:
@@ -147,18 +168,31 @@ def _validate_experiment_immutables(existing: Experiment, experiment_config: Exp
         )
 
 
-def _update_experiment(existing: Experiment, experiment_config: ExperimentConfig) -> None:
-    existing.name = experiment_config.name
-    existing.traffic_allocation = json.dumps(experiment_config.traffic_allocation)
-    existing.status = ExperimentStatus(experiment_config.status)
-    existing.start_date = to_utc(experiment_config.start_date)
-    existing.end_date = to_utc(experiment_config.end_date)
-    existing.segment_allocations = _dump_optional(experiment_config.segment_allocations)
-    existing.geo_allocations = _dump_optional(experiment_config.geo_allocations)
-    existing.stratum_allocations = _dump_optional(experiment_config.stratum_allocations)
-    existing.traffic_percentage = experiment_config.traffic_percentage
-    existing.reserved_percentage = experiment_config.reserved_percentage
-    existing.priority = experiment_config.priority
+def _update_experiment(existing: Experiment, experiment_config: ExperimentConfig) -> bool:
+    """Copy the mutable config fields onto `existing`; returns whether any of them changed."""
+    values = {
+        "name": experiment_config.name,
+        "traffic_allocation": json.dumps(experiment_config.traffic_allocation),
+        "status": ExperimentStatus(experiment_config.status),
+        "start_date": to_utc(experiment_config.start_date),
+        "end_date": to_utc(experiment_config.end_date),
+        "segment_allocations": _dump_optional(experiment_config.segment_allocations),
+        "geo_allocations": _dump_optional(experiment_config.geo_allocations),
+        "stratum_allocations": _dump_optional(experiment_config.stratum_allocations),
+        "traffic_percentage": experiment_config.traffic_percentage,
+        "reserved_percentage": experiment_config.reserved_percentage,
+        "priority": experiment_config.priority,
+    }
+    changed = False
+    for field, value in values.items():
+        current = getattr(existing, field)
+        if field in ("start_date", "end_date"):
+            # SQLite hands dates back naive; they were stored in UTC
+            current = to_utc(current)
+        if current != value:
+            setattr(existing, field, value)
+            changed = True
+    return changed
 
 
 def _dump_optional(value):
@@ -169,49 +203,62 @@ def _normalize_allocations_optional(value):
     return value or {}
 
 
+def _reserved_percentage(experiment_config: ExperimentConfig) -> float:
+    """The config's reserved share; the validator fills it from traffic_percentage when unset."""
+    if experiment_config.reserved_percentage is None:
+        return experiment_config.traffic_percentage
+    return experiment_config.reserved_percentage
+
+
 def _validate_reserved_percentage_change(
     session: Session, layer, existing: Experiment, experiment_config: ExperimentConfig
 ):
-    if experiment_config.reserved_percentage < existing.reserved_percentage - 1e-9:
+    if to_basis_points(_reserved_percentage(experiment_config)) < to_basis_points(existing.reserved_percentage):
         raise ValueError(
             f"experiment {experiment_config.experiment_id} reserved_percentage cannot decrease; "
             "create a new experiment"
         )
-    if experiment_config.reserved_percentage + 1e-9 < experiment_config.traffic_percentage:
+    if to_basis_points(_reserved_percentage(experiment_config)) < to_basis_points(experiment_config.traffic_percentage):
         raise ValueError(
             f"experiment {experiment_config.experiment_id} reserved_percentage must be >= traffic_percentage"
         )
 
-    total_other = (
-        session.execute(
-            select(func.sum(Experiment.reserved_percentage)).where(
+    # Read from the database rather than layer.experiments, which may have been loaded before another
+    # session changed the layer; rounded per experiment like LayerService.add_experiment
+    total_other = sum(
+        to_basis_points(reserved_percentage)
+        for reserved_percentage in session.execute(
+            select(Experiment.reserved_percentage).where(
                 Experiment.layer_id == layer.layer_id,
                 Experiment.experiment_id != existing.experiment_id,
                 Experiment.status != ExperimentStatus.COMPLETED,
             )
-        ).scalar()
-        or 0.0
+        ).scalars()
     )
-    if total_other + experiment_config.reserved_percentage > layer.total_traffic_percentage + 1e-9:
+    if total_other + to_basis_points(_reserved_percentage(experiment_config)) > to_basis_points(
+        layer.total_traffic_percentage
+    ):
         raise ValueError(
             f"experiment {experiment_config.experiment_id} reserved_percentage exceeds layer capacity"
         )
 
 
 def _validate_traffic_percentage_change(existing: Experiment, experiment_config: ExperimentConfig):
-    if experiment_config.traffic_percentage < existing.traffic_percentage - 1e-9:
+    if to_basis_points(experiment_config.traffic_percentage) < to_basis_points(existing.traffic_percentage):
         raise ValueError(
             f"experiment {experiment_config.experiment_id} traffic_percentage cannot decrease; "
             "create a new experiment"
         )
-    if experiment_config.traffic_percentage > experiment_config.reserved_percentage + 1e-9:
+    if to_basis_points(experiment_config.traffic_percentage) > to_basis_points(_reserved_percentage(experiment_config)):
         raise ValueError(
             f"experiment {experiment_config.experiment_id} traffic_percentage cannot exceed reserved_percentage"
         )
 
 
-def _apply_reservation_slots(session: Session, layer, existing: Experiment, experiment_config: ExperimentConfig):
-    desired_slots = math.ceil(experiment_config.reserved_percentage * layer.total_slots)
+def _apply_reservation_slots(
+    session: Session, layer, existing: Experiment, experiment_config: ExperimentConfig
+) -> bool:
+    desired_slots = slots_for_share(_reserved_percentage(experiment_config), layer.total_slots)
     current_slots = (
         session.execute(
             select(func.count())
@@ -230,28 +277,21 @@ def _apply_reservation_slots(session: Session, layer, existing: Experiment, expe
         )
     additional_slots = desired_slots - current_slots
     if additional_slots <= 0:
-        return
+        return False
 
-    free_slots = (
-        session.execute(
-            select(LayerSlot)
-            .where(LayerSlot.layer_id == layer.layer_id, LayerSlot.reserved_experiment_id.is_(None))
-            .order_by(LayerSlot.slot_index)
-            .limit(additional_slots)
-        )
-        .scalars()
-        .all()
+    free_slot_indices = LayerService.find_slots(
+        session, layer.layer_id, additional_slots, LayerSlot.reserved_experiment_id.is_(None)
     )
-    if len(free_slots) < additional_slots:
+    if free_slot_indices is None:
         raise ValueError(
             f"experiment {experiment_config.experiment_id} has insufficient free slots for reservation"
         )
-    for slot in free_slots:
-        slot.reserved_experiment_id = existing.experiment_id
+    LayerService.update_slots(session, layer.layer_id, free_slot_indices, reserved_experiment_id=existing.experiment_id)
+    return True
 
 
-def _apply_ramp_up_slots(session: Session, layer, existing: Experiment, experiment_config: ExperimentConfig):
-    desired_slots = math.ceil(experiment_config.traffic_percentage * layer.total_slots)
+def _apply_ramp_up_slots(session: Session, layer, existing: Experiment, experiment_config: ExperimentConfig) -> bool:
+    desired_slots = slots_for_share(experiment_config.traffic_percentage, layer.total_slots)
     current_slots = (
         session.execute(
             select(func.count())
@@ -267,26 +307,18 @@ def _apply_ramp_up_slots(session: Session, layer, existing: Experiment, experime
         )
     additional_slots = desired_slots - current_slots
     if additional_slots <= 0:
-        return
-
-    free_reserved_slots = (
-        session.execute(
-            select(LayerSlot)
-            .where(
-                LayerSlot.layer_id == layer.layer_id,
-                LayerSlot.reserved_experiment_id == existing.experiment_id,
-                LayerSlot.experiment_id.is_(None),
-            )
-            .order_by(LayerSlot.slot_index)
-            .limit(additional_slots)
-        )
-        .scalars()
-        .all()
+        return False
+
+    free_reserved_slot_indices = LayerService.find_slots(
+        session,
+        layer.layer_id,
+        additional_slots,
+        LayerSlot.reserved_experiment_id == existing.experiment_id,
+        LayerSlot.experiment_id.is_(None),
     )
-    if len(free_reserved_slots) < additional_slots:
+    if free_reserved_slot_indices is None:
         raise ValueError(
             f"experiment {experiment_config.experiment_id} has insufficient reserved slots for ramp up"
         )
-    for slot in free_reserved_slots:
-        slot.experiment_id = existing.experiment_id
-
+    LayerService.update_slots(session, layer.layer_id, free_reserved_slot_indices, experiment_id=existing.experiment_id)
+    return True
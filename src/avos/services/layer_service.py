@@ -1,12 +1,18 @@
 from __future__ import annotations
+import logging
+from datetime import datetime
 from typing import Dict, Any
-import math
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import case, insert, select, func, or_, update
 
 from avos.constants import BUCKET_SPACE
 from avos.models.layer import Layer, LayerSlot
 from avos.models.experiment import Experiment, ExperimentStatus
+from avos.utils.datetime_utils import to_utc, utc_now
+from avos.utils.hashing import DEFAULT_SLOT_HASH, get_slot_hash
+from avos.utils.traffic import slots_for_share, to_basis_points
+
+logger = logging.getLogger(__name__)
 
 
 class LayerService:
@@ -20,29 +26,31 @@ class LayerService:
         layer_salt: str,
         total_slots: int = BUCKET_SPACE,
         total_traffic_percentage: float = 1.0,
+        hash_algo: str = DEFAULT_SLOT_HASH,
     ) -> Layer:
         """Create a new layer with pre-allocated empty slots."""
         if total_slots != BUCKET_SPACE:
             raise ValueError(f"total_slots must be {BUCKET_SPACE} for fixed bucket space")
+        get_slot_hash(hash_algo)
 
         layer = Layer(
             layer_id=layer_id,
             layer_salt=layer_salt,
             total_slots=total_slots,
             total_traffic_percentage=total_traffic_percentage,
+            hash_algo=hash_algo,
         )
         session.add(layer)
-
-        # Pre-create empty slots
-        for i in range(total_slots):
-            session.add(
-                LayerSlot(
-                    layer_id=layer_id,
-                    slot_index=i,
-                    experiment_id=None,
-                    reserved_experiment_id=None,
-                )
-            )
+        session.flush()
+
+        # Empty slots are plain rows; one executemany insert avoids building a mapped object per slot
+        session.execute(
+            insert(LayerSlot),
+            [
+                {"layer_id": layer_id, "slot_index": i, "experiment_id": None, "reserved_experiment_id": None}
+                for i in range(total_slots)
+            ],
+        )
 
         session.commit()
         return layer
@@ -53,9 +61,12 @@ class LayerService:
         return session.execute(select(Layer).where(Layer.layer_id == layer_id)).scalar_one_or_none()
 
     @staticmethod
-    def get_layers(session: Session) -> list[Layer]:
-        """Get layers."""
-        result = session.execute(select(Layer)).scalars().all()
+    def get_layers(session: Session, eager: bool = False) -> list[Layer]:
+        """Get layers; with eager=True their experiments are loaded in one extra IN query."""
+        stmt = select(Layer)
+        if eager:
+            stmt = stmt.options(selectinload(Layer.experiments))
+        result = session.execute(stmt).scalars().all()
         return list(result)
 
     @staticmethod
@@ -78,52 +89,84 @@ class LayerService:
         if experiment.layer_id != layer.layer_id:
             raise ValueError("Experiment.layer_id must match the target layer")
 
-        if experiment.reserved_percentage < experiment.traffic_percentage - 1e-9:
+        if to_basis_points(experiment.reserved_percentage) < to_basis_points(experiment.traffic_percentage):
             raise ValueError("Experiment.reserved_percentage must be >= traffic_percentage")
 
         # Check reservation capacity
-        current_reserved = sum(
-            e.reserved_percentage for e in layer.experiments if e.status != ExperimentStatus.COMPLETED
-        )
-        if current_reserved + experiment.reserved_percentage > layer.total_traffic_percentage + 1e-9:
-            print("Reservation exceeds capacity")  # TODO replace with logging
+        current_reserved = LayerService.reserved_basis_points(layer)
+        if current_reserved + to_basis_points(experiment.reserved_percentage) > to_basis_points(
+            layer.total_traffic_percentage
+        ):
+            logger.warning(
+                "Reservation for experiment %s exceeds capacity of layer %s", experiment.experiment_id, layer.layer_id
+            )
             return False
 
         # Check slot availability for reservation
-        reserved_slots_needed = math.ceil(experiment.reserved_percentage * layer.total_slots)
+        reserved_slots_needed = slots_for_share(experiment.reserved_percentage, layer.total_slots)
+        active_slots_needed = slots_for_share(experiment.traffic_percentage, layer.total_slots)
+        if active_slots_needed > reserved_slots_needed:
+            raise ValueError("Experiment.traffic_percentage cannot exceed reserved_percentage")
 
-        free_slots = (
-            session.execute(
-                select(LayerSlot)
-                .where(LayerSlot.layer_id == layer.layer_id, LayerSlot.reserved_experiment_id.is_(None))
-                .order_by(LayerSlot.slot_index)
-                .limit(reserved_slots_needed)
-            )
-            .scalars()
-            .all()
+        free_slot_indices = LayerService.find_slots(
+            session, layer.layer_id, reserved_slots_needed, LayerSlot.reserved_experiment_id.is_(None)
         )
-
-        if len(free_slots) < reserved_slots_needed:
-            print("Not enough free slots")  # TODO replace with logging
+        if free_slot_indices is None:
+            logger.warning(
+                "Not enough free slots in layer %s for experiment %s (%d needed)",
+                layer.layer_id,
+                experiment.experiment_id,
+                reserved_slots_needed,
+            )
             return False
 
-        # Reserve slots for experiment
-        for slot in free_slots:
-            slot.reserved_experiment_id = experiment.experiment_id
-
-        # Activate slots for current traffic
-        active_slots_needed = math.ceil(experiment.traffic_percentage * layer.total_slots)
-        if active_slots_needed > reserved_slots_needed:
-            raise ValueError("Experiment.traffic_percentage cannot exceed reserved_percentage")
-
-        # Assign slots to experiment
-        for slot in free_slots[:active_slots_needed]:
-            slot.experiment_id = experiment.experiment_id
+        # Append through the relationship so a loaded layer.experiments stays current
+        # even when the session does not expire objects on commit
+        layer.experiments.append(experiment)
+        # The experiment row must exist before slots point at it
+        session.flush()
 
-        session.add(experiment)
+        # Reserve slots for experiment, then activate the first ones for current traffic
+        LayerService.update_slots(
+            session, layer.layer_id, free_slot_indices, reserved_experiment_id=experiment.experiment_id
+        )
+        LayerService.update_slots(
+            session, layer.layer_id, free_slot_indices[:active_slots_needed], experiment_id=experiment.experiment_id
+        )
         session.commit()
         return True
 
+    @staticmethod
+    def reserved_basis_points(layer: Layer) -> int:
+        """Basis points reserved by the layer's not-completed experiments, in one pass over layer.experiments."""
+        return sum(
+            to_basis_points(e.reserved_percentage) for e in layer.experiments if e.status != ExperimentStatus.COMPLETED
+        )
+
+    @staticmethod
+    def find_slots(session: Session, layer_id: str, count: int, *criteria) -> list[int] | None:
+        """Indices of the first `count` slots of the layer matching `criteria`, or None if fewer match."""
+        slot_indices = list(
+            session.execute(
+                select(LayerSlot.slot_index)
+                .where(LayerSlot.layer_id == layer_id, *criteria)
+                .order_by(LayerSlot.slot_index)
+                .limit(count)
+            ).scalars()
+        )
+        return slot_indices if len(slot_indices) == count else None
+
+    @staticmethod
+    def update_slots(session: Session, layer_id: str, slot_indices: list[int], **values) -> None:
+        """Set `values` on the given slots with one UPDATE; loaded LayerSlot objects are kept in sync."""
+        if not slot_indices:
+            return
+        session.execute(
+            update(LayerSlot)
+            .where(LayerSlot.layer_id == layer_id, LayerSlot.slot_index.in_(slot_indices))
+            .values(**values)
+        )
+
     @staticmethod
     def remove_experiment(session: Session, layer: Layer, experiment_id: str) -> bool:
         """Remove experiment from layer, freeing its slots."""
@@ -134,20 +177,13 @@ class LayerService:
         if not experiment:
             return False
 
-        reserved_slots = (
-            session.execute(
-                select(LayerSlot).where(
-                    LayerSlot.layer_id == layer.layer_id, LayerSlot.reserved_experiment_id == experiment_id
-                )
-            )
-            .scalars()
-            .all()
+        # One UPDATE frees every reserved slot; loaded LayerSlot objects are kept in sync
+        session.execute(
+            update(LayerSlot)
+            .where(LayerSlot.layer_id == layer.layer_id, LayerSlot.reserved_experiment_id == experiment_id)
+            .values(experiment_id=None, reserved_experiment_id=None)
         )
 
-        for slot in reserved_slots:
-            slot.experiment_id = None
-            slot.reserved_experiment_id = None
-
         # Mark experiment as completed
         experiment.status = ExperimentStatus.COMPLETED
         session.commit()
@@ -158,29 +194,46 @@ class LayerService:
         """Get experiment by ID."""
         return session.get(Experiment, experiment_id)
 
+    @staticmethod
+    def get_active_experiment_ids(
+        session: Session, layer_id: str | None = None, now: datetime | None = None
+    ) -> list[str]:
+        """Get IDs of experiments active at `now` (UTC), filtered in SQL like Experiment.is_active."""
+        current_time = to_utc(now) or utc_now()
+        stmt = select(Experiment.experiment_id).where(
+            Experiment.status == ExperimentStatus.ACTIVE,
+            or_(Experiment.start_date.is_(None), Experiment.start_date <= current_time),
+            or_(Experiment.end_date.is_(None), Experiment.end_date >= current_time),
+        )
+        if layer_id is not None:
+            stmt = stmt.where(Experiment.layer_id == layer_id)
+        return list(session.execute(stmt.order_by(Experiment.experiment_id)).scalars().all())
+
     # ---------- layer stats ----------
     @staticmethod
     def get_layer_info(session: Session, layer: Layer) -> Dict[str, Any]:
         """Get detailed information about layer utilization."""
         total_slots = layer.total_slots
 
-        free_slots_result = session.execute(
-            select(func.count())
-            .select_from(LayerSlot)
-            .where(LayerSlot.layer_id == layer.layer_id, LayerSlot.reserved_experiment_id.is_(None))
-        ).scalar()
-        free_slots = free_slots_result or 0
-
-        # Count slots per experiment
-        experiment_slot_counts = {}
-        for experiment in layer.experiments:
-            count_result = session.execute(
-                select(func.count())
-                .select_from(LayerSlot)
-                .where(LayerSlot.layer_id == layer.layer_id, LayerSlot.experiment_id == experiment.experiment_id)
-            ).scalar()
-            count = count_result or 0
-            experiment_slot_counts[experiment.experiment_id] = count
+        # One grouped pass over the layer's slots yields both the per-experiment slot counts
+        # and the number of unreserved slots
+        slot_counts = {}
+        free_slots = 0
+        for experiment_id, slot_count, unreserved_count in session.execute(
+            select(
+                LayerSlot.experiment_id,
+                func.count(),
+                func.sum(case((LayerSlot.reserved_experiment_id.is_(None), 1), else_=0)),
+            )
+            .where(LayerSlot.layer_id == layer.layer_id)
+            .group_by(LayerSlot.experiment_id)
+        ):
+            free_slots += unreserved_count or 0
+            if experiment_id is not None:
+                slot_counts[experiment_id] = slot_count
+        experiment_slot_counts = {
+            experiment.experiment_id: slot_counts.get(experiment.experiment_id, 0) for experiment in layer.experiments
+        }
 
         return {
             "layer_id": layer.layer_id,
@@ -201,8 +254,6 @@ class LayerService:
     @staticmethod
     def bulk_free_experiment_slots(session: Session, layer_id: str, experiment_id: str) -> int:
         """Bulk free all slots for an experiment. Returns number of slots freed."""
-        from sqlalchemy import update
-
         result = session.execute(
             update(LayerSlot)
             .where(LayerSlot.layer_id == layer_id, LayerSlot.reserved_experiment_id == experiment_id)
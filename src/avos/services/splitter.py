@@ -1,12 +1,21 @@
 from abc import ABC, abstractmethod
-from typing import List, Iterable, Union, Dict
+from bisect import bisect_right
+from typing import List, Iterable, Union, Dict, Optional, Tuple
 import hashlib
 import random
 
+import numpy as np
+
 
 _ALLOC_TOLERANCE = 1e-6
 
 
+def _hash_fraction(base_string: str) -> float:
+    """Map a string to [0, 1) via the full MD5 digest read as a big-endian integer."""
+    digest = hashlib.md5(base_string.encode()).digest()
+    return int.from_bytes(digest, "big") / 2**128
+
+
 def normalize_allocations(
     variants: List[str],
     allocation_map: Dict[str, float],
@@ -20,13 +29,15 @@ def normalize_allocations(
     if not isinstance(allocation_map, dict):
         raise ValueError(f"{context} must be a dict of variant to allocation")
 
-    missing = [variant for variant in variants if variant not in allocation_map]
-    extra = [variant for variant in allocation_map if variant not in variants]
-    if missing or extra:
+    # Same keys exactly when sizes agree and no key is unknown; the diagnostic lists are only built on failure
+    variant_set = set(variants)
+    if len(allocation_map) != len(variant_set) or not variant_set.issuperset(allocation_map):
+        missing = [variant for variant in variants if variant not in allocation_map]
+        extra = [variant for variant in allocation_map if variant not in variant_set]
         raise ValueError(f"{context} keys must match variants (missing={missing}, extra={extra})")
 
     values = [float(allocation_map[variant]) for variant in variants]
-    if any(value < 0 for value in values):
+    if min(values) < 0:
         raise ValueError(f"{context} must be non-negative")
     total = sum(values)
     if total <= 0:
@@ -38,6 +49,33 @@ def normalize_allocations(
     raise ValueError(f"{context} must sum to 1.0 (got {total})")
 
 
+def _cumulative_boundaries(allocations: Iterable[float]) -> List[float]:
+    boundaries = []
+    cumulative = 0.0
+    for allocation in allocations:
+        cumulative += allocation
+        boundaries.append(cumulative)
+    return boundaries
+
+
+def _keyed_boundaries(cache: dict, variants: List[str], allocation_map: dict, key: str, context: str) -> List[float]:
+    """Validated cumulative boundaries for one segment/geo/stratum, built once per splitter."""
+    cache_key = (key, tuple(variants))
+    boundaries = cache.get(cache_key)
+    if boundaries is None:
+        boundaries = _cumulative_boundaries(normalize_allocations(variants, allocation_map, context=context))
+        cache[cache_key] = boundaries
+    return boundaries
+
+
+def _pick_variant(variants: List[str], boundaries: List[float], val: float) -> str:
+    # First bucket whose upper boundary is above val
+    index = bisect_right(boundaries, val)
+    if index < len(variants):
+        return variants[index]
+    return variants[-1]  # Fallback if rounding edge-case
+
+
 class BaseSplitter(ABC):
     """
     Abstract base class for all splitters.
@@ -80,32 +118,46 @@ class HashBasedSplitter(BaseSplitter):
 
     def __init__(self, experiment_id: str):
         self.exp_id = experiment_id
+        # (variants, allocations) of the last call and their cumulative bucket boundaries
+        self._bucket_cache: Optional[Tuple[tuple, List[float]]] = None
+
+    def _boundaries(self, variants: List[str], allocations: Iterable[float]) -> List[float]:
+        key = (tuple(variants), tuple(allocations))
+        if self._bucket_cache is not None and self._bucket_cache[0] == key:
+            return self._bucket_cache[1]
 
-    def assign_variant(self, unit_id: Union[str, int], variants: List[str], allocations: Iterable[float]) -> str:
         # Validate inputs
-        allocations = list(allocations)
-        if not variants or len(variants) != len(allocations):
+        variant_key, allocation_key = key
+        if not variant_key or len(variant_key) != len(allocation_key):
             raise ValueError("Variants and allocations must have the same length")
-        total = sum(allocations)
+        total = sum(allocation_key)
         if abs(total - 1.0) > _ALLOC_TOLERANCE:
             raise ValueError("Allocations must sum to 1.0")
 
-        # Compute bucket boundaries
-        buckets = []
-        cumulative = 0.0
-        for variant, alloc in zip(variants, allocations):
-            cumulative += alloc
-            buckets.append((variant, cumulative))
+        boundaries = _cumulative_boundaries(allocation_key)
+        self._bucket_cache = (key, boundaries)
+        return boundaries
 
-        # Hash to [0, 1)
-        base_string = f"{unit_id}{self.exp_id}"
-        digest = hashlib.md5(base_string.encode()).hexdigest()
-        val = int(digest, 16) / 2**128
+    def assign_variant(self, unit_id: Union[str, int], variants: List[str], allocations: Iterable[float]) -> str:
+        boundaries = self._boundaries(variants, allocations)
 
-        for variant, boundary in buckets:
-            if val < boundary:
-                return variant
-        return variants[-1]  # Fallback if rounding edge-case
+        # Hash to [0, 1)
+        val = _hash_fraction(f"{unit_id}{self.exp_id}")
+        return _pick_variant(variants, boundaries, val)
+
+    def assign_variants(
+        self, unit_ids: Iterable[Union[str, int]], variants: List[str], allocations: Iterable[float]
+    ) -> List[str]:
+        """`assign_variant` for a batch of units sharing the same variants and allocations."""
+        boundaries = self._boundaries(variants, allocations)
+        exp_id = self.exp_id
+        md5, from_bytes, scale = hashlib.md5, int.from_bytes, 2**128
+        # _hash_fraction inlined: the per-unit hash is the only Python-level work left
+        fractions = [from_bytes(md5(f"{unit_id}{exp_id}".encode()).digest(), "big") / scale for unit_id in unit_ids]
+        indices = np.searchsorted(boundaries, fractions, side="right")
+        # Clamping to the last variant is the rounding fallback of assign_variant
+        np.minimum(indices, len(variants) - 1, out=indices)
+        return np.array(variants, dtype=object)[indices].tolist()
 
 
 class SegmentedSplitter(BaseSplitter):
@@ -118,31 +170,20 @@ class SegmentedSplitter(BaseSplitter):
     def __init__(self, experiment_id: str, segment_allocations: dict):
         self.exp_id = experiment_id
         self.segment_allocations = segment_allocations  # {segment: {variant: allocation}}
+        self._boundaries: Dict[tuple, List[float]] = {}
 
     def assign_variant(self, unit_id, variants, allocations, segment=None):
         if not variants:
             raise ValueError("Variants required for segment split!")
         if segment is None or segment not in self.segment_allocations:
             raise ValueError(f"Required segment for assignment!")
-        seg_allocs = normalize_allocations(
-            variants, self.segment_allocations[segment], context=f"segment '{segment}'"
+        boundaries = _keyed_boundaries(
+            self._boundaries, variants, self.segment_allocations[segment], segment, f"segment '{segment}'"
         )
 
         # Use hash-based deterministic split within segment
-        base_string = f"{unit_id}{self.exp_id}{segment}"
-
-        digest = hashlib.md5(base_string.encode()).hexdigest()
-        val = int(digest, 16) / 2**128
-
-        # Buckets
-        buckets, cumulative = [], 0.0
-        for v, a in zip(variants, seg_allocs):
-            cumulative += a
-            buckets.append((v, cumulative))
-        for v, upper in buckets:
-            if val < upper:
-                return v
-        return variants[-1]
+        val = _hash_fraction(f"{unit_id}{self.exp_id}{segment}")
+        return _pick_variant(variants, boundaries, val)
 
 
 class StratifiedSplitter(BaseSplitter):
@@ -154,29 +195,19 @@ class StratifiedSplitter(BaseSplitter):
     def __init__(self, experiment_id: str, stratum_allocations: dict):
         self.exp_id = experiment_id
         self.stratum_allocations = stratum_allocations
+        self._boundaries: Dict[tuple, List[float]] = {}
 
     def assign_variant(self, unit_id, variants, allocations, stratum=None):
         if not variants:
             raise ValueError("Variants required for stratified split!")
         if stratum is None or stratum not in self.stratum_allocations:
             raise ValueError("Stratum required for stratified split!")
-        stratum_allocs = normalize_allocations(
-            variants, self.stratum_allocations[stratum], context=f"stratum '{stratum}'"
+        boundaries = _keyed_boundaries(
+            self._boundaries, variants, self.stratum_allocations[stratum], stratum, f"stratum '{stratum}'"
         )
         # Deterministic hash (add stratum to salt)
-        base_string = f"{unit_id}{self.exp_id}{stratum}"
-        import hashlib
-
-        digest = hashlib.md5(base_string.encode()).hexdigest()
-        val = int(digest, 16) / 2**128
-        buckets, cumulative = [], 0.0
-        for v, a in zip(variants, stratum_allocs):
-            cumulative += a
-            buckets.append((v, cumulative))
-        for v, upper in buckets:
-            if val < upper:
-                return v
-        return variants[-1]
+        val = _hash_fraction(f"{unit_id}{self.exp_id}{stratum}")
+        return _pick_variant(variants, boundaries, val)
 
 
 class GeoBasedSplitter(BaseSplitter):
@@ -188,23 +219,13 @@ class GeoBasedSplitter(BaseSplitter):
     def __init__(self, experiment_id: str, geo_allocations: dict):
         self.exp_id = experiment_id
         self.geo_allocations = geo_allocations
+        self._boundaries: Dict[tuple, List[float]] = {}
 
     def assign_variant(self, unit_id, variants, allocations, geo=None):
         if not variants:
             raise ValueError("Variants required for geo split!")
         if geo is None or geo not in self.geo_allocations:
             raise ValueError("Geo required for geo-based split!")
-        geo_allocs = normalize_allocations(variants, self.geo_allocations[geo], context=f"geo '{geo}'")
-        base_string = f"{unit_id}{self.exp_id}{geo}"
-        import hashlib
-
-        digest = hashlib.md5(base_string.encode()).hexdigest()
-        val = int(digest, 16) / 2**128
-        buckets, cumulative = [], 0.0
-        for v, a in zip(variants, geo_allocs):
-            cumulative += a
-            buckets.append((v, cumulative))
-        for v, upper in buckets:
-            if val < upper:
-                return v
-        return variants[-1]
+        boundaries = _keyed_boundaries(self._boundaries, variants, self.geo_allocations[geo], geo, f"geo '{geo}'")
+        val = _hash_fraction(f"{unit_id}{self.exp_id}{geo}")
+        return _pick_variant(variants, boundaries, val)
@@ -1,10 +1,24 @@
 from scipy.stats import chisquare, chi2
 import numpy as np
-from typing import Dict, List, Optional, Union
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 
 
-@dataclass
+@lru_cache(maxsize=1024)
+def _chisquare_cached(observed_counts: tuple, expected_counts: tuple) -> tuple:
+    # Re-checks (e.g. before/after a ramp-up, repeated previews) often see identical counts
+    chi2_stat, p_value = chisquare(f_obs=observed_counts, f_exp=expected_counts)
+    return float(chi2_stat), float(p_value)
+
+
+@lru_cache(maxsize=128)
+def _chi2_critical_value(degrees_of_freedom: int, alpha: float) -> float:
+    # chi2.ppf is an iterative inverse; SRM checks only ever ask for a handful of (dof, alpha) pairs
+    return float(chi2.ppf(1 - alpha, degrees_of_freedom))
+
+
+@dataclass(slots=True)
 class SRMResult:
     """Structured SRM test result"""
 
@@ -47,7 +61,21 @@ class SRMTester:
         Returns:
             SRMResult object
         """
-        observed_counts = np.array(observed_counts, dtype=int)
+        observed, proportions = self._prepare_inputs(observed_counts, expected_proportions)
+
+        # Calculate expected counts
+        total_sample_size = int(observed.sum())
+        expected_counts = proportions * total_sample_size
+
+        # Perform chi-square test
+        chi2_stat, p_value = _chisquare_cached(tuple(observed.tolist()), tuple(expected_counts.tolist()))
+
+        return self._build_result(chi2_stat, p_value, observed, expected_counts, proportions, total_sample_size)
+
+    def _prepare_inputs(self, observed_counts, expected_proportions) -> Tuple[np.ndarray, np.ndarray]:
+        """Validate counts and resolve normalized expected proportions."""
+        # asarray: no copy when callers already hold an int array
+        observed_counts = np.asarray(observed_counts, dtype=int)
 
         # Validate input
         if len(observed_counts) < 2:
@@ -59,21 +87,18 @@ class SRMTester:
         if expected_proportions is None:
             expected_proportions = np.ones(len(observed_counts)) / len(observed_counts)
         else:
-            expected_proportions = np.array(expected_proportions, dtype=float)
+            expected_proportions = np.asarray(expected_proportions, dtype=float)
             # Normalize to ensure they sum to 1
             expected_proportions = expected_proportions / expected_proportions.sum()
 
         if len(expected_proportions) != len(observed_counts):
             raise ValueError("Expected proportions must match number of groups")
 
-        # Calculate expected counts
-        total_sample_size = observed_counts.sum()
-        expected_counts = expected_proportions * total_sample_size
-
-        # Perform chi-square test
-        chi2_stat, p_value = chisquare(f_obs=observed_counts, f_exp=expected_counts)
-        degrees_of_freedom = len(observed_counts) - 1
+        return observed_counts, expected_proportions
 
+    def _build_result(
+        self, chi2_stat, p_value, observed_counts, expected_counts, expected_proportions, total_sample_size
+    ) -> SRMResult:
         # Significance classification
         severity = self._classify_severity(p_value)
         reject_null = p_value < self.alpha
@@ -81,7 +106,7 @@ class SRMTester:
         return SRMResult(
             chi2_stat=chi2_stat,
             p_value=p_value,
-            degrees_of_freedom=degrees_of_freedom,
+            degrees_of_freedom=len(observed_counts) - 1,
             severity=severity,
             reject_null=reject_null,
             observed_counts=observed_counts.tolist(),
@@ -111,22 +136,49 @@ class SRMTester:
             return ""
 
     def batch_test(self, experiments_data: Dict[str, Dict]) -> Dict[str, SRMResult]:
-        """Test multiple experiments for SRM in batch"""
-        results = {}
+        """Test multiple experiments for SRM in batch
+
+        Experiments with the same number of groups share one vectorized chi-square call.
+        """
+        prepared = {}
         for exp_id, data in experiments_data.items():
             try:
-                results[exp_id] = self.test(
-                    observed_counts=data["observed"], expected_proportions=data.get("expected"), experiment_id=exp_id
-                )
+                prepared[exp_id] = self._prepare_inputs(data["observed"], data.get("expected"))
             except Exception as e:
                 print(f"SRM test failed for {exp_id}: {e}")
 
-        return results
+        groups: Dict[int, List[str]] = {}
+        for exp_id, (observed_counts, _) in prepared.items():
+            groups.setdefault(len(observed_counts), []).append(exp_id)
+
+        results = {}
+        for exp_ids in groups.values():
+            observed = np.vstack([prepared[exp_id][0] for exp_id in exp_ids])
+            proportions = np.vstack([prepared[exp_id][1] for exp_id in exp_ids])
+            totals = observed.sum(axis=1)
+            expected = proportions * totals[:, None]
+            try:
+                chi2_stats, p_values = chisquare(f_obs=observed, f_exp=expected, axis=1)
+            except Exception:
+                # Fall back to per-experiment tests so one bad row only drops itself
+                for exp_id in exp_ids:
+                    try:
+                        observed_counts, expected_proportions = prepared[exp_id]
+                        results[exp_id] = self.test(observed_counts, expected_proportions, experiment_id=exp_id)
+                    except Exception as e:
+                        print(f"SRM test failed for {exp_id}: {e}")
+                continue
+            for i, exp_id in enumerate(exp_ids):
+                results[exp_id] = self._build_result(
+                    chi2_stats[i], p_values[i], observed[i], expected[i], proportions[i], int(totals[i])
+                )
+
+        return {exp_id: results[exp_id] for exp_id in prepared if exp_id in results}
 
     def critical_value(self, degrees_of_freedom: int, alpha: Optional[float] = None) -> float:
         """Get critical chi-square value for given degrees of freedom"""
         alpha = alpha or self.alpha
-        return chi2.ppf(1 - alpha, degrees_of_freedom)
+        return _chi2_critical_value(int(degrees_of_freedom), float(alpha))
 
     def significance_legend(self) -> str:
         """Return R-style significance legend"""
@@ -2,17 +2,21 @@ from pathlib import Path
 import yaml
 from avos.models.config_models import LayerConfig, ExperimentConfig
 
+# libyaml's C loader when PyYAML was built with it; same documents as yaml.safe_load, parsed in C
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
-def load_layer_config(path):
+
+def _load_yaml(path):
     with open(path) as f:
-        data = yaml.safe_load(f)
-    return LayerConfig(**data)
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+
+def load_layer_config(path):
+    return LayerConfig.model_validate(_load_yaml(path))
 
 
 def load_experiment_config(path):
-    with open(path) as f:
-        data = yaml.safe_load(f)
-    return ExperimentConfig(**data)
+    return ExperimentConfig.model_validate(_load_yaml(path))
 
 
 def load_layer_configs_from_dir(path: str) -> list[LayerConfig]:
@@ -0,0 +1,37 @@
+import hashlib
+from typing import Callable, Dict
+
+try:
+    import xxhash  # type: ignore[import-not-found]
+except ImportError:  # optional extra: avos[xxhash]
+    xxhash = None
+
+# Changing a layer's slot hash re-buckets every unit, so the algorithm is fixed per layer
+DEFAULT_SLOT_HASH = "md5"
+
+SLOT_HASHES: Dict[str, Callable[[bytes], bytes]] = {
+    "md5": lambda data: hashlib.md5(data, usedforsecurity=False).digest(),
+    # 64-bit BLAKE2b: no wasted digest bytes and faster than MD5 on short keys
+    "blake2b": lambda data: hashlib.blake2b(data, digest_size=8, usedforsecurity=False).digest(),
+}
+
+# Slot hashes that are only registered when their optional package is installed
+OPTIONAL_SLOT_HASHES = {"xxh64": "xxhash", "xxh3": "xxhash"}
+
+if xxhash is not None:
+    # Canonical (big-endian) 64-bit XXH64; slots only need uniformity, not a cryptographic hash
+    SLOT_HASHES["xxh64"] = xxhash.xxh64_digest
+    # 64-bit XXH3: the SIMD successor of XXH64, faster still on short unit ids
+    SLOT_HASHES["xxh3"] = xxhash.xxh3_64_digest
+
+
+def get_slot_hash(hash_algo: str) -> Callable[[bytes], bytes]:
+    """Digest function for a layer's slot hash algorithm."""
+    try:
+        return SLOT_HASHES[hash_algo]
+    except KeyError:
+        if hash_algo in OPTIONAL_SLOT_HASHES:
+            raise ValueError(
+                f"Slot hash algorithm {hash_algo} requires the {OPTIONAL_SLOT_HASHES[hash_algo]} package"
+            ) from None
+        raise ValueError(f"Unknown slot hash algorithm: {hash_algo}") from None
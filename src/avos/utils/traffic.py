@@ -0,0 +1,11 @@
+from avos.constants import TRAFFIC_BASIS_POINTS
+
+
+def to_basis_points(share: float) -> int:
+    """Traffic share in [0, 1] as integer basis points; finer precision is rounded away."""
+    return round(share * TRAFFIC_BASIS_POINTS)
+
+
+def slots_for_share(share: float, total_slots: int) -> int:
+    """Slots needed to cover `share` of a layer, rounded up, without float rounding."""
+    return -(-to_basis_points(share) * total_slots // TRAFFIC_BASIS_POINTS)
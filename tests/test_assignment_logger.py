@@ -1,4 +1,10 @@
-from avos.services.assignment_logger import InMemoryAssignmentLogger
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from avos.services.assignment_logger import AsyncAssignmentLogger, InMemoryAssignmentLogger
 
 
 def test_in_memory_assignment_logger():
@@ -29,3 +35,192 @@ def test_in_memory_assignment_logger():
         assert count == 2
     finally:
         logger.close()
+
+
+def test_in_memory_assignment_logger_bulk_batch_keeps_columns():
+    logger = InMemoryAssignmentLogger()
+    try:
+        assignments = [
+            {
+                "unit_id": f"u{i}",
+                "layer_id": "layer1",
+                "slot_index": i,
+                "experiment_id": "exp1" if i % 2 else None,
+                "experiment_name": "Experiment One" if i % 2 else None,
+                "variant": "A" if i % 2 else None,
+                "status": "assigned" if i % 2 else "not_assigned",
+            }
+            for i in range(2000)
+        ]
+        logger.log_assignments(assignments)
+        logger.log_assignments([])
+        rows = logger.con.execute(
+            "SELECT status, COUNT(*), COUNT(variant), COUNT(DISTINCT assignment_timestamp) "
+            "FROM user_assignments GROUP BY status ORDER BY status"
+        ).fetchall()
+        assert rows == [("assigned", 1000, 1000, 1), ("not_assigned", 1000, 0, 1)]
+        row = logger.con.execute("SELECT unit_id, slot_index FROM user_assignments WHERE unit_id = 'u7'").fetchone()
+        assert row == ("u7", 7)
+    finally:
+        logger.close()
+
+
+def test_in_memory_assignment_logger_requires_core_columns():
+    logger = InMemoryAssignmentLogger()
+    try:
+        with pytest.raises(KeyError, match="layer_id"):
+            logger.log_assignments([{"unit_id": "u1", "slot_index": 1, "status": "not_assigned"}])
+        assert logger.con.execute("SELECT COUNT(*) FROM user_assignments").fetchone() == (0,)
+    finally:
+        logger.close()
+
+
+def test_assignment_logger_reports():
+    logger = InMemoryAssignmentLogger()
+    try:
+        logger.log_assignments(
+            [
+                {
+                    "unit_id": f"u{i}",
+                    "layer_id": "layer1",
+                    "slot_index": i,
+                    "experiment_id": "exp1" if i < 5 else None,
+                    "experiment_name": "Experiment One" if i < 5 else None,
+                    "variant": ("A" if i < 3 else "B") if i < 5 else None,
+                    "status": "assigned" if i < 5 else "not_assigned",
+                }
+                for i in range(8)
+            ]
+        )
+        assert logger.report_variants("exp1") == [("exp1", "A", 3), ("exp1", "B", 2)]
+        assert logger.report_variants("missing") == []
+        assert sorted(logger.report_status()) == [("assigned", 5), ("not_assigned", 3)]
+        recent = logger.report_recent(limit=2)
+        assert len(recent) == 2
+        assert all(row[1] == "exp1" for row in recent)
+    finally:
+        logger.close()
+
+
+def test_async_assignment_logger_coalesces_and_flushes():
+    inner = InMemoryAssignmentLogger()
+    logger = AsyncAssignmentLogger(inner)
+    try:
+        for i in range(100):
+            logger.log_assignments(
+                [
+                    {
+                        "unit_id": f"u{i}",
+                        "layer_id": "layer1",
+                        "slot_index": i,
+                        "experiment_id": "exp1",
+                        "experiment_name": "Experiment One",
+                        "variant": "AB"[i % 2],
+                        "status": "assigned",
+                    }
+                ]
+            )
+        assert sorted(logger.report_variants("exp1")) == [("exp1", "A", 50), ("exp1", "B", 50)]
+    finally:
+        logger.close()
+    assert not logger._thread.is_alive()
+
+
+def test_async_assignment_logger_reraises_write_errors():
+    inner = MagicMock()
+    inner.log_assignments.side_effect = RuntimeError("database down")
+    logger = AsyncAssignmentLogger(inner)
+    logger.log_assignments([{"unit_id": "u1"}])
+    with pytest.raises(RuntimeError, match="database down"):
+        logger.flush()
+    logger.flush()  # the error is reported once
+    logger.close()
+    inner.close.assert_called_once()
+
+
+def test_async_assignment_logger_waits_to_fill_batches():
+    inner = MagicMock()
+    logger = AsyncAssignmentLogger(inner, max_batch_size=2, flush_interval=0.5)
+    for i in range(5):
+        logger.log_assignments([{"unit_id": f"u{i}"}])
+    logger.close()
+    assert [len(call.args[0]) for call in inner.log_assignments.call_args_list] == [2, 2, 1]
+
+
+def test_async_assignment_logger_rejects_use_after_close():
+    inner = MagicMock()
+    logger = AsyncAssignmentLogger(inner)
+    logger.close()
+    with pytest.raises(RuntimeError, match="closed"):
+        logger.log_assignments([{"unit_id": "u1"}])
+    with pytest.raises(RuntimeError, match="closed"):
+        logger.flush()
+    logger.close()
+    inner.close.assert_called_once()
+    inner.log_assignments.assert_not_called()
+
+
+def test_async_assignment_logger_never_shares_wrapped_logger_between_threads():
+    active, overlaps = [], []
+
+    class SlowLogger:
+        def _use(self):
+            if active:
+                overlaps.append(True)
+            active.append(True)
+            time.sleep(0.001)
+            active.pop()
+
+        def log_assignments(self, assignments):
+            self._use()
+
+        def report_status(self):
+            self._use()
+            return []
+
+        def close(self):
+            pass
+
+    def write():
+        for i in range(100):
+            logger.log_assignments([{"unit_id": f"u{i}"}])
+            time.sleep(0.001)
+
+    logger = AsyncAssignmentLogger(SlowLogger())
+    writer = threading.Thread(target=write)
+    writer.start()
+    while writer.is_alive():
+        logger.report_status()
+    writer.join()
+    logger.close()
+    assert overlaps == []
+
+
+def test_async_assignment_logger_close_races_with_log_assignments():
+    for _ in range(20):
+        inner = MagicMock()
+        logger = AsyncAssignmentLogger(inner)
+        put = logger._queue.put
+
+        def slow_put(item):
+            # Widens the gap between the closed check and the enqueue
+            time.sleep(0.0005)
+            put(item)
+
+        logger._queue.put = slow_put
+        accepted = []
+
+        def write():
+            for i in range(1000):
+                try:
+                    logger.log_assignments([{"unit_id": f"u{i}"}])
+                except RuntimeError:
+                    return
+                accepted.append(i)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        logger.close()
+        writer.join()
+        written = sum(len(call.args[0]) for call in inner.log_assignments.call_args_list)
+        assert written == len(accepted)
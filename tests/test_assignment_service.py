@@ -1,10 +1,20 @@
+import hashlib
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.interfaces import CacheStats
+from sqlalchemy.orm import sessionmaker
+from avos.models.base import Base
+from avos.models.experiment import ExperimentStatus
+from avos.services.layer_service import LayerService
+from avos.services import assignment_service
 from avos.services.assignment_service import AssignmentService
 from avos.services.splitter import HashBasedSplitter
 from avos.models.layer import Layer, LayerSlot
 from avos.models.experiment import Experiment
 from avos.srm_tester import SRMTester
+from avos.utils.hashing import OPTIONAL_SLOT_HASHES, SLOT_HASHES
 
 
 def make_layer(layer_id="layer1", salt="abc", slots=5):
@@ -12,6 +22,7 @@ def make_layer(layer_id="layer1", salt="abc", slots=5):
     layer.layer_id = layer_id
     layer.layer_salt = salt
     layer.total_slots = slots
+    layer.hash_algo = "md5"
     return layer
 
 
@@ -35,16 +46,55 @@ def make_experiment(exp_id="exp1", variants=["A", "B"], allocations=[0.5, 0.5],
     return exp
 
 
+def make_session(slot, exp=None):
+    session = MagicMock()
+    session.get.side_effect = lambda model, key: slot if model is LayerSlot else exp
+    return session
+
+
+def make_bulk_session(slots, experiments):
+    session = MagicMock()
+    # One query for the layer's slot owners, one for their experiments
+    result = session.execute.return_value
+    result.all.return_value = [(slot.slot_index, slot.experiment_id) for slot in slots if slot.experiment_id]
+    result.scalars.return_value.all.return_value = experiments
+    return session
+
+
+@pytest.fixture
+def db_session():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.rollback()
+    session.close()
+
+
+def add_layer_with_experiment(session, layer_id, experiment_id, traffic_percentage=0.5):
+    """Persisted layer with one active A/B experiment on `traffic_percentage` of its slots."""
+    layer = LayerService.create_layer(session, layer_id, f"salt_{layer_id}")
+    experiment = Experiment(
+        experiment_id=experiment_id,
+        layer_id=layer_id,
+        name=experiment_id,
+        variants=["A", "B"],
+        traffic_allocation={"A": 0.5, "B": 0.5},
+        traffic_percentage=traffic_percentage,
+        status=ExperimentStatus.ACTIVE,
+    )
+    assert LayerService.add_experiment(session, layer, experiment) is True
+    return layer
+
+
 def test_assignment_for_assigned_slot(monkeypatch):
     """Assigned slot with active experiment returns correct assignment."""
     layer = make_layer()
     slot = make_slot(layer.layer_id, 0, "exp1")
     exp = make_experiment()
 
-    # Fake SQLAlchemy session and query
-    session = MagicMock()
-    session.execute.return_value.scalar_one_or_none.return_value = slot
-    session.get.return_value = exp
+    # Fake SQLAlchemy session lookups
+    session = make_session(slot, exp)
 
     assignment = AssignmentService.assign_for_layer(session, layer, "userX")
     assert assignment["experiment_id"] == "exp1"
@@ -56,8 +106,7 @@ def test_assignment_for_unassigned_slot():
     """Unassigned slot returns 'not_assigned' and None experiment."""
     layer = make_layer()
     slot = make_slot(layer.layer_id, 0, None)
-    session = MagicMock()
-    session.execute.return_value.scalar_one_or_none.return_value = slot
+    session = make_session(slot)
 
     assignment = AssignmentService.assign_for_layer(session, layer, "userY")
     assert assignment["experiment_id"] is None
@@ -72,9 +121,7 @@ def test_assignment_for_inactive_experiment():
     exp = make_experiment(exp_id="exp2")
     exp.is_active.return_value = False
 
-    session = MagicMock()
-    session.execute.return_value.scalar_one_or_none.return_value = slot
-    session.get.return_value = exp
+    session = make_session(slot, exp)
 
     assignment = AssignmentService.assign_for_layer(session, layer, "userZ")
     assert assignment["experiment_id"] == "exp2"
@@ -90,13 +137,78 @@ def test_assignment_slot_hash_consistency():
     assert idx1 == idx2
 
 
+def test_slot_hash_is_md5_of_unit_and_salt():
+    """Slot hashing must stay stable so existing users keep their buckets."""
+    for uid in ["user1", "user_000042", 12345]:
+        expected = int(hashlib.md5(f"{uid}testhash".encode("utf-8")).hexdigest(), 16) % 1000
+        assert AssignmentService._calculate_user_slot("testhash", 1000, uid) == expected
+
+
+def test_bulk_slots_match_single_slot_hash():
+    unit_ids = [f"user{i}" for i in range(200)] + [1, 2, 3]
+    slots = AssignmentService._calculate_user_slots("bulk_salt", 1000, unit_ids)
+    assert slots.tolist() == [AssignmentService._calculate_user_slot("bulk_salt", 1000, uid) for uid in unit_ids]
+    assert AssignmentService._calculate_user_slots("bulk_salt", 1000, []).size == 0
+
+
+def test_calculate_slots_uses_layer_hash_settings():
+    layer = make_layer(salt="layer_salt", slots=1000)
+    layer.hash_algo = "blake2b"
+    unit_ids = [f"user{i}" for i in range(50)] + [7]
+
+    slots = AssignmentService.calculate_slots(layer, unit_ids)
+
+    assert slots.tolist() == [
+        AssignmentService._calculate_user_slot("layer_salt", 1000, uid, "blake2b") for uid in unit_ids
+    ]
+
+
+@pytest.mark.parametrize("hash_algo", sorted(SLOT_HASHES))
+def test_bulk_slots_match_single_slot_hash_per_algorithm(hash_algo):
+    unit_ids = [f"user{i}" for i in range(200)]
+    slots = AssignmentService._calculate_user_slots("algo_salt", 1000, unit_ids, hash_algo)
+    single = [AssignmentService._calculate_user_slot("algo_salt", 1000, uid, hash_algo) for uid in unit_ids]
+    assert slots.tolist() == single
+    assert 0 <= slots.min() and slots.max() < 1000
+
+
+def test_slot_hash_algorithms_bucket_differently():
+    unit_ids = [f"user{i}" for i in range(200)]
+    md5_slots = AssignmentService._calculate_user_slots("algo_salt", 1000, unit_ids, "md5")
+    blake_slots = AssignmentService._calculate_user_slots("algo_salt", 1000, unit_ids, "blake2b")
+    assert (md5_slots != blake_slots).any()
+
+
+def test_unknown_slot_hash_rejected():
+    with pytest.raises(ValueError, match="Unknown slot hash algorithm"):
+        AssignmentService._calculate_user_slot("salt", 1000, "user", "sha0")
+
+
+@pytest.mark.parametrize("hash_algo", sorted(OPTIONAL_SLOT_HASHES))
+def test_optional_slot_hash_requires_its_package(monkeypatch, hash_algo):
+    monkeypatch.delitem(SLOT_HASHES, hash_algo, raising=False)
+    with pytest.raises(ValueError, match="requires the xxhash package"):
+        AssignmentService._calculate_user_slot("salt", 1000, "user", hash_algo)
+
+
+@pytest.mark.parametrize("hash_algo", sorted(OPTIONAL_SLOT_HASHES))
+def test_optional_slot_hash_bulk_matches_single(hash_algo):
+    pytest.importorskip(OPTIONAL_SLOT_HASHES[hash_algo])
+    unit_ids = [f"user{i}" for i in range(200)] + [42]
+    single = [AssignmentService._calculate_user_slot("algo_salt", 1000, uid, hash_algo) for uid in unit_ids]
+    slots = AssignmentService._calculate_user_slots("algo_salt", 1000, unit_ids, hash_algo)
+    byte_slots = AssignmentService._calculate_user_slots(
+        "algo_salt", 1000, np.array([str(uid).encode() for uid in unit_ids]), hash_algo
+    )
+    assert slots.tolist() == single
+    assert byte_slots.tolist() == single
+
+
 def test_bulk_assignment(monkeypatch):
     layer = make_layer()
-    slot = make_slot(layer.layer_id, 0, "exp1")
+    slots = [make_slot(layer.layer_id, i, "exp1") for i in range(layer.total_slots)]
     exp = make_experiment()
-    session = MagicMock()
-    session.execute.return_value.scalar_one_or_none.return_value = slot
-    session.get.return_value = exp
+    session = make_bulk_session(slots, [exp])
 
     assign_dict = AssignmentService.assign_bulk_for_layer(session, layer, ["u1", "u2"])
     assert set(assign_dict.keys()) == {"u1", "u2"}
@@ -107,11 +219,9 @@ def test_bulk_assignment(monkeypatch):
 
 def test_preview_assignment_distribution(monkeypatch):
     layer = make_layer()
-    slot = make_slot(layer.layer_id, 0, "exp1")
+    slots = [make_slot(layer.layer_id, i, "exp1") for i in range(layer.total_slots)]
     exp = make_experiment()
-    session = MagicMock()
-    session.execute.return_value.scalar_one_or_none.return_value = slot
-    session.get.return_value = exp
+    session = make_bulk_session(slots, [exp])
     uids = [f"user{i}" for i in range(50)]
 
     preview = AssignmentService.preview_assignment_distribution(session, layer, uids)
@@ -119,20 +229,117 @@ def test_preview_assignment_distribution(monkeypatch):
     assert "assignment_distribution" in preview
     assert preview["unassigned_count"] == 0
     assert preview["assignment_rate"] == 100.0
+    assert session.execute.call_count == 2
+
+
+def test_bulk_assignment_logs_once_per_batch():
+    layer = make_layer()
+    slots = [make_slot(layer.layer_id, i, "exp1") for i in range(layer.total_slots)]
+    session = make_bulk_session(slots, [make_experiment()])
+    logger = MagicMock()
+
+    AssignmentService.assign_bulk_for_layer(session, layer, ["u1", "u2", "u3"], assignment_logger=logger)
+
+    logger.log_assignments.assert_called_once()
+    assert [a["unit_id"] for a in logger.log_assignments.call_args.args[0]] == ["u1", "u2", "u3"]
+
+
+def test_bulk_assignment_reuses_precomputed_slots(monkeypatch):
+    layer = make_layer(slots=100)
+    slots = [make_slot(layer.layer_id, i, "exp1" if i % 3 else None) for i in range(layer.total_slots)]
+    exp = make_experiment()
+    uids = [f"user{i}" for i in range(100)]
+    slot_indices = AssignmentService.calculate_slots(layer, uids)
+    expected = AssignmentService.assign_bulk_for_layer(make_bulk_session(slots, [exp]), layer, uids)
+
+    monkeypatch.setattr(AssignmentService, "calculate_slots", MagicMock(side_effect=AssertionError("rehashed")))
+    result = AssignmentService.assign_bulk_for_layer(
+        make_bulk_session(slots, [exp]), layer, uids, slot_indices=slot_indices
+    )
+
+    assert result == expected
+    with pytest.raises(ValueError, match="one entry per unit_id"):
+        AssignmentService.assign_bulk_for_layer(
+            make_bulk_session(slots, [exp]), layer, uids, slot_indices=slot_indices[:10]
+        )
+
+
+def test_bulk_assignment_builds_one_splitter_per_experiment(monkeypatch):
+    layer = make_layer(slots=10)
+    slots = [make_slot(layer.layer_id, i, "exp1" if i < 5 else "exp2") for i in range(layer.total_slots)]
+    session = make_bulk_session(slots, [make_experiment("exp1"), make_experiment("exp2")])
+    select_splitter = MagicMock(wraps=AssignmentService._select_splitter)
+    monkeypatch.setattr(AssignmentService, "_select_splitter", select_splitter)
+
+    assignments = AssignmentService.assign_bulk_for_layer(session, layer, [f"user{i}" for i in range(200)])
+
+    assert {a["experiment_id"] for a in assignments.values()} == {"exp1", "exp2"}
+    assert select_splitter.call_count == 2
+
+
+def test_bulk_assignment_hashes_duplicate_units_once(monkeypatch):
+    layer = make_layer(slots=100)
+    slots = [make_slot(layer.layer_id, i, "exp1" if i % 2 else None) for i in range(layer.total_slots)]
+    exp = make_experiment()
+    uids = ["u1", "u2", "u1", 7, "u3", 7, "u2"]
+    slot_indices = AssignmentService.calculate_slots(layer, uids)
+    expected = AssignmentService.assign_bulk_for_layer(
+        make_bulk_session(slots, [exp]), layer, uids, slot_indices=slot_indices
+    )
+    calculate_slots = MagicMock(wraps=AssignmentService.calculate_slots)
+    monkeypatch.setattr(AssignmentService, "calculate_slots", calculate_slots)
+
+    assignments = AssignmentService.assign_bulk_for_layer(make_bulk_session(slots, [exp]), layer, uids)
+    byte_assignments = AssignmentService.assign_bulk_for_layer(
+        make_bulk_session(slots, [exp]), layer, np.array([b"u1", b"u2", b"u1", b"u3"])
+    )
+
+    assert assignments == expected
+    assert list(assignments) == ["u1", "u2", 7, "u3"]
+    assert calculate_slots.call_args_list[0].args[1] == ["u1", "u2", 7, "u3"]
+    assert byte_assignments == {uid: expected[uid] for uid in ["u1", "u2", "u3"]}
+
+
+def test_bulk_assignment_checks_activity_once_per_experiment():
+    layer = make_layer(slots=10)
+    slots = [make_slot(layer.layer_id, i, "exp1") for i in range(layer.total_slots)]
+    exp = make_experiment(splitter="geo")
+    exp.get_geo_allocations.return_value = {"US": {"A": 0.5, "B": 0.5}}
+    session = make_bulk_session(slots, [exp])
+
+    assignments = AssignmentService.assign_bulk_for_layer(session, layer, [f"user{i}" for i in range(50)], geo="US")
+
+    assert {a["status"] for a in assignments.values()} == {"assigned"}
+    exp.is_active.assert_called_once()
+
+
+def test_preview_assignment_distribution_counts_duplicate_units():
+    layer = make_layer()
+    slots = [make_slot(layer.layer_id, i, None) for i in range(layer.total_slots)]
+    session = make_bulk_session(slots, [])
+    uids = ["user1", "user2", "user1"]
+
+    preview = AssignmentService.preview_assignment_distribution(session, layer, uids)
+    assert preview["total_users"] == 3
+    assert preview["unassigned_count"] == 3
+    assert preview["assignment_rate"] == 0.0
 
 
 def test_preview_assignment_metrics_with_srm():
     layer = make_layer()
-    slot = make_slot(layer.layer_id, 0, "exp1")
+    slots = [make_slot(layer.layer_id, i, "exp1") for i in range(layer.total_slots)]
     exp = make_experiment()
-    session = MagicMock()
-    session.execute.return_value.scalar_one_or_none.return_value = slot
+    session = make_bulk_session(slots, [exp])
     session.get.return_value = exp
     uids = [f"user{i}" for i in range(100)]
 
     metrics = AssignmentService.preview_assignment_metrics(session, layer, uids, srm_tester=SRMTester())
     assert "srm_results" in metrics
     assert "exp1" in metrics["srm_results"]
+    assert metrics["unassigned_count"] == 0
+    assert sum(metrics["assignment_distribution"].values()) == 100
+    # Sample is assigned in one bulk pass: slot owners and experiments, not two queries per unit
+    assert session.execute.call_count == 2
 
 
 def test_assignment_with_percentage_allocations_rejected():
@@ -140,9 +347,103 @@ def test_assignment_with_percentage_allocations_rejected():
     slot = make_slot(layer.layer_id, 0, "exp1")
     exp = make_experiment(allocations=[50, 50])
 
-    session = MagicMock()
-    session.execute.return_value.scalar_one_or_none.return_value = slot
-    session.get.return_value = exp
+    session = make_session(slot, exp)
 
     with pytest.raises(ValueError, match="traffic_allocation must sum to 1.0"):
         AssignmentService.assign_for_layer(session, layer, "user_pct")
+
+
+def test_single_assignment_sees_changes_committed_by_another_session(db_session):
+    LayerService.create_layer(db_session, "layer_fresh", "salt_fresh")
+    db_session.commit()
+    reader = sessionmaker(bind=db_session.get_bind())()
+    try:
+        layer = LayerService.get_layer(reader, "layer_fresh")
+        assert AssignmentService.assign_for_layer(reader, layer, "user_fresh")["status"] == "not_assigned"
+
+        # Another session ramps the layer to 100% while the reader's transaction stays open
+        writer_layer = LayerService.get_layer(db_session, "layer_fresh")
+        experiment = Experiment(
+            experiment_id="exp_fresh",
+            layer_id="layer_fresh",
+            name="Fresh",
+            variants=["A", "B"],
+            traffic_allocation={"A": 0.5, "B": 0.5},
+            traffic_percentage=1.0,
+            status=ExperimentStatus.ACTIVE,
+        )
+        assert LayerService.add_experiment(db_session, writer_layer, experiment) is True
+
+        assignment = AssignmentService.assign_for_layer(reader, layer, "user_fresh")
+        assert assignment["status"] == "assigned"
+        assert assignment["experiment_id"] == "exp_fresh"
+    finally:
+        reader.close()
+
+
+def test_preview_distribution_multi_matches_single_layer_previews(db_session):
+    layers = [add_layer_with_experiment(db_session, layer_id, f"exp_{layer_id}") for layer_id in ("layer_a", "layer_b")]
+    uids = [f"user{i}" for i in range(200)] + [7, 7]
+
+    previews = AssignmentService.preview_assignment_distribution_multi(db_session, layers, uids)
+
+    assert list(previews) == ["layer_a", "layer_b"]
+    for layer in layers:
+        assert previews[layer.layer_id] == AssignmentService.preview_assignment_distribution(db_session, layer, uids)
+
+
+def test_bulk_assignment_accepts_byte_id_arrays():
+    layer = make_layer(slots=100)
+    slots = [make_slot(layer.layer_id, i, "exp1" if i % 2 else None) for i in range(layer.total_slots)]
+    uids = [f"user_{i}" for i in range(50)] + ["usér_ü"]
+    byte_ids = np.array([uid.encode("utf-8") for uid in uids])
+    exp = make_experiment()
+
+    expected = AssignmentService.assign_bulk_for_layer(make_bulk_session(slots, [exp]), layer, uids)
+    result = AssignmentService.assign_bulk_for_layer(make_bulk_session(slots, [exp]), layer, byte_ids)
+
+    assert result == expected
+    assert AssignmentService._calculate_user_slots("abc", 100, byte_ids).tolist() == [
+        AssignmentService._calculate_user_slot("abc", 100, uid) for uid in uids
+    ]
+
+
+def test_repeat_service_statements_hit_compiled_cache(db_session):
+    layer = add_layer_with_experiment(db_session, "layer_cache", "exp_cache")
+
+    def run(unit_ids):
+        AssignmentService.assign_bulk_for_layer(db_session, layer, unit_ids)
+        LayerService.get_layer_info(db_session, layer)
+        LayerService.get_active_experiment_ids(db_session, layer_id="layer_cache")
+
+    run([f"user{i}" for i in range(10)])
+    cache_stats = []
+
+    @event.listens_for(db_session.get_bind(), "before_cursor_execute")
+    def record_cache_hit(conn, cursor, statement, parameters, context, executemany):
+        cache_stats.append(context.cache_hit)
+
+    # Different batch sizes must reuse the compiled statements, including the expanding IN
+    run([f"user{i}" for i in range(25)])
+
+    assert cache_stats
+    assert all(stat == CacheStats.CACHE_HIT for stat in cache_stats)
+
+
+def test_small_bulk_batch_reads_only_its_slots(db_session, monkeypatch):
+    layer = add_layer_with_experiment(db_session, "layer_small", "exp_small")
+    uids = [f"user{i}" for i in range(40)]
+
+    slot_queries = []
+
+    @event.listens_for(db_session.get_bind(), "before_cursor_execute")
+    def record_slot_query(conn, cursor, statement, parameters, context, executemany):
+        if "FROM layer_slots" in statement:
+            slot_queries.append(statement)
+
+    small = AssignmentService.assign_bulk_for_layer(db_session, layer, uids)
+    monkeypatch.setattr(assignment_service, "_SLOT_LOOKUP_FULL_TABLE_RATIO", layer.total_slots)
+    full = AssignmentService.assign_bulk_for_layer(db_session, layer, uids)
+
+    assert full == small
+    assert ["layer_slots.slot_index IN" in query for query in slot_queries] == [True, False]
@@ -58,6 +58,13 @@ def test_layer_config_defaults():
     assert layer.total_slots == BUCKET_SPACE  # default value
 
 
+def test_layer_config_hash_algo():
+    assert LayerConfig(layer_id="l4", layer_salt="salt").hash_algo == "md5"
+    assert LayerConfig(layer_id="l4", layer_salt="salt", hash_algo="blake2b").hash_algo == "blake2b"
+    with pytest.raises(Exception):
+        LayerConfig(layer_id="l4", layer_salt="salt", hash_algo="crc32")
+
+
 def test_layer_config_custom_total_slots_rejected():
     with pytest.raises(Exception):
         LayerConfig(layer_id="l3", layer_salt="salt", total_slots=10)
@@ -133,3 +140,16 @@ def test_segment_allocations_require_segment_splitter():
             segment_allocations={"US": {"A": 0.5, "B": 0.5}},
             splitter_type="hash",
         )
+
+
+def test_segment_allocation_keys_mismatch_reports_segment():
+    with pytest.raises(ValueError, match=r"segment_allocations 'EU' keys .*missing=\['B'\], extra=\['C'\]"):
+        ExperimentConfig(
+            experiment_id="exp_bad_segment_keys",
+            layer_id="layer1",
+            name="Bad Segment Keys",
+            variants=["A", "B"],
+            traffic_allocation={"A": 0.5, "B": 0.5},
+            segment_allocations={"US": {"A": 0.5, "B": 0.5}, "EU": {"A": 0.5, "C": 0.5}},
+            splitter_type="segment",
+        )
@@ -1,5 +1,5 @@
 import pytest
-from sqlalchemy import create_engine, select, func
+from sqlalchemy import create_engine, event, select, func
 from sqlalchemy.orm import sessionmaker
 
 from avos.constants import BUCKET_SPACE
@@ -55,6 +55,14 @@ def test_apply_layer_configs_creates_layer_and_experiment(db_session):
     assert allocated_slots == BUCKET_SPACE // 2
 
 
+def test_apply_layer_configs_hash_algo_fixed_per_layer(db_session):
+    apply_layer_configs(db_session, [LayerConfig(layer_id="layer_hash", layer_salt="salt_hash", hash_algo="blake2b")])
+    assert LayerService.get_layer(db_session, "layer_hash").hash_algo == "blake2b"
+
+    with pytest.raises(ValueError, match="hash_algo mismatch"):
+        apply_layer_configs(db_session, [LayerConfig(layer_id="layer_hash", layer_salt="salt_hash")])
+
+
 def test_apply_layer_configs_completed_frees_slots(db_session):
     layer_config = LayerConfig(
         layer_id="layer_sync",
@@ -313,6 +321,100 @@ def test_apply_layer_configs_traffic_percentage_ramp_up(db_session):
     assert allocated_slots == BUCKET_SPACE // 2
 
 
+def test_apply_layer_configs_ramp_up_without_autoflush():
+    engine = create_engine("sqlite:///:memory:", echo=False)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+
+    def layer_config(traffic_percentage):
+        return LayerConfig(
+            layer_id="layer_sync",
+            layer_salt="salt_sync",
+            total_slots=BUCKET_SPACE,
+            total_traffic_percentage=1.0,
+            experiments=[
+                ExperimentConfig(
+                    experiment_id="exp_sync",
+                    layer_id="layer_sync",
+                    name="Sync Test",
+                    variants=["A", "B"],
+                    traffic_allocation={"A": 0.5, "B": 0.5},
+                    status="active",
+                    traffic_percentage=traffic_percentage,
+                )
+            ],
+        )
+
+    apply_layer_configs(session, [layer_config(0.3)])
+    apply_layer_configs(session, [layer_config(0.5)])
+
+    allocated_slots = session.execute(
+        select(func.count())
+        .select_from(LayerSlot)
+        .where(LayerSlot.layer_id == "layer_sync", LayerSlot.experiment_id == "exp_sync")
+    ).scalar()
+    assert allocated_slots == BUCKET_SPACE // 2
+    session.close()
+
+
+def test_apply_layer_configs_looks_up_experiments_once_per_layer(db_session):
+    experiments = [
+        ExperimentConfig(
+            experiment_id=f"exp_{index}",
+            layer_id="layer_sync",
+            name=f"Sync Test {index}",
+            variants=["A", "B"],
+            traffic_allocation={"A": 0.5, "B": 0.5},
+            status="active",
+            traffic_percentage=0.2,
+        )
+        for index in range(4)
+    ]
+    statements = []
+    event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]), named=False)
+
+    apply_layer_configs(
+        db_session, [LayerConfig(layer_id="layer_sync", layer_salt="salt_sync", experiments=experiments)]
+    )
+
+    experiment_lookups = [sql for sql in statements if "WHERE experiments.experiment_id" in sql]
+    assert len(experiment_lookups) == 1
+    assert "IN" in experiment_lookups[0]
+    layer = LayerService.get_layer(db_session, "layer_sync")
+    assert LayerService.get_layer_info(db_session, layer)["free_slots"] == 200
+
+
+def test_apply_layer_configs_unchanged_resync_skips_commit(db_session):
+    def layer_config(name):
+        return LayerConfig(
+            layer_id="layer_sync",
+            layer_salt="salt_sync",
+            experiments=[
+                ExperimentConfig(
+                    experiment_id="exp_sync",
+                    layer_id="layer_sync",
+                    name=name,
+                    variants=["A", "B"],
+                    traffic_allocation={"A": 0.5, "B": 0.5},
+                    status="active",
+                    traffic_percentage=0.3,
+                    start_date="2025-01-01T00:00:00+00:00",
+                )
+            ],
+        )
+
+    apply_layer_configs(db_session, [layer_config("Sync Test")])
+    commits = []
+    event.listen(db_session, "after_commit", commits.append)
+
+    apply_layer_configs(db_session, [layer_config("Sync Test")])
+    assert commits == []
+
+    apply_layer_configs(db_session, [layer_config("Renamed")])
+    assert len(commits) == 1
+    assert LayerService.get_experiment(db_session, "exp_sync").name == "Renamed"
+
+
 def test_apply_layer_configs_traffic_percentage_decrease_rejected(db_session):
     layer_config = LayerConfig(
         layer_id="layer_sync",
@@ -353,3 +455,71 @@ def test_apply_layer_configs_traffic_percentage_decrease_rejected(db_session):
 
     with pytest.raises(ValueError, match="traffic_percentage cannot decrease"):
         apply_layer_configs(db_session, [decreased])
+
+
+def test_apply_layer_configs_reserved_increase_beyond_capacity_rejected(db_session):
+    def experiment_config(experiment_id, reserved_percentage):
+        return ExperimentConfig(
+            experiment_id=experiment_id,
+            layer_id="layer_sync",
+            name="Sync Test",
+            variants=["A", "B"],
+            traffic_allocation={"A": 0.5, "B": 0.5},
+            status="active",
+            traffic_percentage=0.3,
+            reserved_percentage=reserved_percentage,
+        )
+
+    layer_config = LayerConfig(
+        layer_id="layer_sync",
+        layer_salt="salt_sync",
+        experiments=[experiment_config("exp_a", 0.4), experiment_config("exp_b", 0.4)],
+    )
+    apply_layer_configs(db_session, [layer_config])
+
+    grown = layer_config.model_copy(update={"experiments": [experiment_config("exp_a", 0.6)]})
+    apply_layer_configs(db_session, [grown])
+    assert LayerService.get_experiment(db_session, "exp_a").reserved_percentage == 0.6
+
+    overgrown = layer_config.model_copy(update={"experiments": [experiment_config("exp_b", 0.5)]})
+    with pytest.raises(ValueError, match="exceeds layer capacity"):
+        apply_layer_configs(db_session, [overgrown])
+
+
+def test_apply_layer_configs_reserved_increase_sees_other_sessions(db_session):
+    def experiment_config(reserved_percentage):
+        return ExperimentConfig(
+            experiment_id="exp_a",
+            layer_id="layer_sync",
+            name="Sync Test",
+            variants=["A", "B"],
+            traffic_allocation={"A": 0.5, "B": 0.5},
+            status="active",
+            traffic_percentage=0.3,
+            reserved_percentage=reserved_percentage,
+        )
+
+    layer_config = LayerConfig(layer_id="layer_sync", layer_salt="salt_sync", experiments=[experiment_config(0.3)])
+    apply_layer_configs(db_session, [layer_config])
+    # Hold the layer with its experiments loaded in this session while another session reserves capacity
+    layer = LayerService.get_layer(db_session, "layer_sync")
+    assert len(layer.experiments) == 1
+
+    other = sessionmaker(bind=db_session.get_bind())()
+    try:
+        other_experiment = ExperimentConfig(
+            experiment_id="exp_other",
+            layer_id="layer_sync",
+            name="Other",
+            variants=["A", "B"],
+            traffic_allocation={"A": 0.5, "B": 0.5},
+            status="active",
+            traffic_percentage=0.6,
+        )
+        apply_layer_configs(other, [layer_config.model_copy(update={"experiments": [other_experiment]})])
+    finally:
+        other.close()
+
+    grown = layer_config.model_copy(update={"experiments": [experiment_config(0.5)]})
+    with pytest.raises(ValueError, match="exceeds layer capacity"):
+        apply_layer_configs(db_session, [grown])
@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from avos.db_config import dispose_engines, get_session
+from avos.services.layer_service import LayerService
+from avos.utils.hashing import DEFAULT_SLOT_HASH
+
+
+@pytest.fixture(autouse=True)
+def fresh_engines():
+    # get_session caches engines per URL for the process; start and leave every test without them
+    dispose_engines()
+    yield
+    dispose_engines()
+
+
+def test_get_session_reuses_engine_per_url():
+    first = get_session("sqlite:///:memory:")
+    second = get_session("sqlite:///:memory:")
+    assert first is not second
+    assert first.get_bind() is second.get_bind()
+
+    LayerService.create_layer(first, "shared_layer", "salt")
+    assert LayerService.get_layer(second, "shared_layer") is not None
+    first.close()
+    second.close()
+
+
+def test_dispose_engines_discards_in_memory_database():
+    session = get_session("sqlite:///:memory:")
+    LayerService.create_layer(session, "shared_layer", "salt")
+    bind = session.get_bind()
+    session.close()
+
+    dispose_engines()
+    fresh = get_session("sqlite:///:memory:")
+    assert fresh.get_bind() is not bind
+    assert LayerService.get_layer(fresh, "shared_layer") is None
+    fresh.close()
+
+
+def test_get_session_upgrades_layers_without_hash_algo(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'old.db'}"
+    # Layers table as created before hash_algo existed
+    engine = create_engine(db_url)
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE layers (layer_id VARCHAR PRIMARY KEY, layer_salt VARCHAR NOT NULL, "
+                "total_slots INTEGER, total_traffic_percentage FLOAT, created_at DATETIME, updated_at DATETIME)"
+            )
+        )
+        connection.execute(
+            text("INSERT INTO layers VALUES ('old_layer', 'salt', 100, 1.0, '2024-01-01', '2024-01-01')")
+        )
+    engine.dispose()
+
+    session = get_session(db_url)
+    layer = LayerService.get_layer(session, "old_layer")
+    assert layer is not None
+    assert layer.hash_algo == DEFAULT_SLOT_HASH
+    session.close()
+
+
+def test_get_session_indexes_experiments_layer_id_on_existing_tables(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'old.db'}"
+    # Experiments table as created before layer_id was indexed
+    engine = create_engine(db_url)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE experiments (experiment_id VARCHAR PRIMARY KEY, layer_id VARCHAR)"))
+    engine.dispose()
+
+    session = get_session(db_url)
+    indexes = {index["name"]: index["column_names"] for index in inspect(session.get_bind()).get_indexes("experiments")}
+    assert indexes["ix_experiments_layer_id"] == ["layer_id"]
+    session.close()
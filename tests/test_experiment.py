@@ -1,7 +1,7 @@
 import pytest
 import json
 from datetime import datetime, timedelta
-from sqlalchemy import create_engine, select
+from sqlalchemy import create_engine, inspect, select
 from sqlalchemy.orm import sessionmaker
 
 from avos.models.base import Base
@@ -106,6 +106,25 @@ class TestExperimentCreation:
         assert exp.get_variant_list() == ["control", "treatment"]
         assert exp.get_traffic_dict() == {"control": 0.5, "treatment": 0.5}
 
+    def test_experiment_helper_methods_track_column_changes(self, db_session, sample_layer, sample_experiment_data):
+        """Parsed JSON is reused but never stale or shared with callers."""
+        exp = Experiment(**sample_experiment_data)
+
+        exp.get_traffic_dict()["control"] = 0.9
+        assert exp.get_traffic_dict() == {"control": 0.5, "treatment": 0.5}
+
+        exp.traffic_allocation = json.dumps({"control": 0.2, "treatment": 0.8})
+        assert exp.get_traffic_dict() == {"control": 0.2, "treatment": 0.8}
+
+    def test_experiment_allocation_maps_not_shared(self, db_session, sample_layer, sample_experiment_data):
+        sample_experiment_data["splitter_type"] = "segment"
+        sample_experiment_data["segment_allocations"] = {"US": {"control": 0.6, "treatment": 0.4}}
+        exp = Experiment(**sample_experiment_data)
+
+        exp.get_segment_allocations()["US"]["control"] = 1.0
+        assert exp.get_segment_allocations() == {"US": {"control": 0.6, "treatment": 0.4}}
+        assert exp.get_geo_allocations() == {}
+
     def test_experiment_timestamps_auto_populated(self, db_session, sample_layer, sample_experiment_data):
         """Test that created_at and updated_at are automatically populated."""
         # Don't provide timestamps
@@ -118,6 +137,7 @@ class TestExperimentCreation:
         assert exp.updated_at is not None
         assert isinstance(exp.created_at, datetime)
         assert isinstance(exp.updated_at, datetime)
+        assert exp.created_at == exp.updated_at
 
 
 class TestExperimentIsActive:
@@ -204,6 +224,10 @@ class TestExperimentValidation:
 class TestExperimentRelationships:
     """Test experiment relationships with other models."""
 
+    def test_experiment_layer_id_indexed(self, db_session):
+        indexes = inspect(db_session.get_bind()).get_indexes("experiments")
+        assert ["layer_id"] in [index["column_names"] for index in indexes]
+
     def test_experiment_layer_relationship(self, db_session, sample_layer, sample_experiment_data):
         """Test that experiment properly links to its layer."""
         exp = Experiment(**sample_experiment_data)
@@ -1,7 +1,8 @@
+import logging
 import math
 import pytest
 from datetime import datetime, timedelta, UTC
-from sqlalchemy import create_engine, select, func
+from sqlalchemy import create_engine, event, select, func
 from sqlalchemy.orm import sessionmaker
 
 from avos.constants import BUCKET_SPACE
@@ -64,6 +65,16 @@ class TestLayerCRUD:
         assert layer.total_slots == BUCKET_SPACE
         assert layer.total_traffic_percentage == 0.8
 
+    def test_create_layer_hash_algo(self, db_session):
+        """Layers hash with md5 unless another slot hash is chosen."""
+        assert LayerService.create_layer(db_session, "md5_layer", "salt").hash_algo == "md5"
+        layer = LayerService.create_layer(db_session, "blake_layer", "salt", hash_algo="blake2b")
+        assert layer.hash_algo == "blake2b"
+
+    def test_create_layer_unknown_hash_algo_rejected(self, db_session):
+        with pytest.raises(ValueError, match="Unknown slot hash algorithm"):
+            LayerService.create_layer(db_session, "bad_hash_layer", "salt", hash_algo="sha0")
+
     def test_create_layer_with_custom_total_slots_rejected(self, db_session):
         with pytest.raises(ValueError, match="total_slots must be"):
             LayerService.create_layer(db_session, "custom_layer", "custom_salt", total_slots=50)
@@ -176,6 +187,22 @@ class TestExperimentCRUD:
         assert active_slots == math.ceil(0.3 * BUCKET_SPACE)
         assert reserved_slots == math.ceil(0.6 * BUCKET_SPACE)
 
+    def test_add_experiment_updates_loaded_slots(self, db_session, sample_experiment_data):
+        """Slots already in the session reflect the reservation without a refresh."""
+        layer = LayerService.create_layer(db_session, "test_layer", "salt")
+        # Keep loaded state across commits so only the UPDATE's session sync can change it
+        db_session.expire_on_commit = False
+        first = db_session.get(LayerSlot, ("test_layer", 0))
+        last = db_session.get(LayerSlot, ("test_layer", BUCKET_SPACE - 1))
+
+        assert LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data)) is True
+
+        assert first.experiment_id == "test_exp_001"
+        assert first.reserved_experiment_id == "test_exp_001"
+        assert last.experiment_id is None
+        free = LayerService.find_slots(db_session, "test_layer", BUCKET_SPACE, LayerSlot.experiment_id.is_(None))
+        assert free is None
+
     def test_add_experiment_layer_id_mismatch(self, db_session, sample_experiment_data):
         """Test adding experiment with mismatched layer_id raises error."""
         layer = LayerService.create_layer(db_session, "layer_a", "salt")
@@ -185,7 +212,7 @@ class TestExperimentCRUD:
         with pytest.raises(ValueError, match="Experiment.layer_id must match the target layer"):
             LayerService.add_experiment(db_session, layer, experiment)
 
-    def test_add_experiment_exceeds_traffic_capacity(self, db_session, sample_experiment_data):
+    def test_add_experiment_exceeds_traffic_capacity(self, db_session, sample_experiment_data, caplog):
         """Test adding experiment that would exceed traffic capacity."""
         # Create layer with limited traffic capacity
         layer = LayerService.create_layer(
@@ -200,8 +227,10 @@ class TestExperimentCRUD:
         # Try to add second experiment (50% traffic) - should fail
         sample_experiment_data["experiment_id"] = "test_exp_002"
         exp2 = Experiment(**sample_experiment_data)
-        success2 = LayerService.add_experiment(db_session, layer, exp2)
+        with caplog.at_level(logging.WARNING, logger="avos.services.layer_service"):
+            success2 = LayerService.add_experiment(db_session, layer, exp2)
         assert success2 is False
+        assert "test_exp_002 exceeds capacity of layer test_layer" in caplog.text
 
     def test_add_experiment_not_enough_slots(self, db_session, sample_experiment_data):
         """Test adding experiment when not enough free slots available."""
@@ -247,6 +276,17 @@ class TestExperimentCRUD:
         success2 = LayerService.add_experiment(db_session, layer, exp2)
         assert success2 is True
 
+    def test_add_experiment_reuses_capacity_of_removed_experiment(self, db_session, sample_experiment_data):
+        """Removing an experiment releases its reservation for the capacity check."""
+        layer = LayerService.create_layer(db_session, "test_layer", "salt", total_traffic_percentage=0.6)
+        assert LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data)) is True
+
+        sample_experiment_data["experiment_id"] = "test_exp_002"
+        assert LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data)) is False
+
+        assert LayerService.remove_experiment(db_session, layer, "test_exp_001") is True
+        assert LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data)) is True
+
     def test_remove_experiment_success(self, db_session, sample_experiment_data):
         """Test successfully removing an experiment."""
         # Setup: create layer and add experiment
@@ -286,6 +326,19 @@ class TestExperimentCRUD:
         ).scalar()
         assert allocated_slots_after == 0
 
+    def test_remove_experiment_updates_loaded_slots(self, db_session, sample_experiment_data):
+        """Slots already in the session are freed without a refresh."""
+        layer = LayerService.create_layer(db_session, "test_layer", "salt")
+        LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data))
+        db_session.expire_on_commit = False
+        slot = db_session.get(LayerSlot, ("test_layer", 0))
+        assert slot.reserved_experiment_id == "test_exp_001"
+
+        assert LayerService.remove_experiment(db_session, layer, "test_exp_001") is True
+
+        assert slot.experiment_id is None
+        assert slot.reserved_experiment_id is None
+
     def test_remove_experiment_not_exists(self, db_session):
         """Test removing a non-existent experiment returns False."""
         layer = LayerService.create_layer(db_session, "test_layer", "salt")
@@ -308,6 +361,28 @@ class TestExperimentCRUD:
         experiment = LayerService.get_experiment(db_session, "nonexistent")
         assert experiment is None
 
+    def test_get_active_experiment_ids_matches_is_active(self, db_session, sample_experiment_data):
+        """SQL filter agrees with Experiment.is_active for status and date windows."""
+        layer = LayerService.create_layer(db_session, "active_layer", "salt")
+        now = datetime.now(UTC)
+        windows = {
+            "running": (now - timedelta(hours=1), now + timedelta(hours=1), ExperimentStatus.ACTIVE),
+            "open_ended": (None, None, ExperimentStatus.ACTIVE),
+            "not_started": (now + timedelta(minutes=5), None, ExperimentStatus.ACTIVE),
+            "ended": (None, now - timedelta(seconds=1), ExperimentStatus.ACTIVE),
+            "paused": (now - timedelta(hours=1), now + timedelta(hours=1), ExperimentStatus.PAUSED),
+        }
+        sample_experiment_data.update(layer_id="active_layer", traffic_percentage=0.1)
+        for exp_id, (start, end, status) in windows.items():
+            sample_experiment_data.update(experiment_id=exp_id, start_date=start, end_date=end, status=status)
+            assert LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data))
+
+        active_ids = LayerService.get_active_experiment_ids(db_session, layer_id="active_layer", now=now)
+
+        assert active_ids == ["open_ended", "running"]
+        assert active_ids == sorted(e.experiment_id for e in layer.experiments if e.is_active(now))
+        assert LayerService.get_active_experiment_ids(db_session, layer_id="other_layer", now=now) == []
+
 
 class TestLayerInfo:
     """Test layer information and statistics."""
@@ -369,6 +444,24 @@ class TestLayerInfo:
         assert info["free_slots"] == BUCKET_SPACE  # All slots freed
         assert info["used_slots"] == 0
 
+    def test_get_layer_info_queries_do_not_grow_with_experiments(self, db_session, sample_experiment_data):
+        """Free and per-experiment slot counts come from one grouped query."""
+        layer = LayerService.create_layer(db_session, "query_layer", "salt")
+        sample_experiment_data["layer_id"] = "query_layer"
+        sample_experiment_data["traffic_percentage"] = 0.1
+        for i in range(5):
+            sample_experiment_data["experiment_id"] = f"query_exp_{i}"
+            assert LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data))
+
+        layers = LayerService.get_layers(db_session, eager=True)
+        statements = []
+        event.listen(db_session.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+        info = LayerService.get_layer_info(db_session, layers[0])
+
+        assert len(statements) == 1
+        assert info["experiment_slot_counts"] == {f"query_exp_{i}": 100 for i in range(5)}
+        assert info["free_slots"] == BUCKET_SPACE - 500
+
 
 class TestLayerServiceEdgeCases:
     """Test edge cases and boundary conditions."""
@@ -416,6 +509,18 @@ class TestLayerServiceEdgeCases:
         ).scalar()
         assert allocated_slots == BUCKET_SPACE
 
+    def test_add_experiments_filling_layer_exactly(self, db_session, sample_experiment_data):
+        """Shares summing to the layer's capacity fit even when their float sum overshoots it."""
+        layer = LayerService.create_layer(db_session, "test_layer", "salt")
+        assert 0.33 + 0.56 + 0.11 > 1.0
+
+        for index, share in enumerate([0.33, 0.56, 0.11]):
+            sample_experiment_data["experiment_id"] = f"exp_{index}"
+            sample_experiment_data["traffic_percentage"] = share
+            assert LayerService.add_experiment(db_session, layer, Experiment(**sample_experiment_data)) is True
+
+        assert LayerService.get_layer_info(db_session, layer)["free_slots"] == 0
+
     def test_multiple_experiments_different_traffic_percentages(self, db_session, sample_experiment_data):
         """Test adding multiple experiments with different traffic percentages."""
         layer = LayerService.create_layer(db_session, "multi_exp", "salt")
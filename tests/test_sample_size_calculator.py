@@ -0,0 +1,101 @@
+import math
+
+import numpy as np
+import pytest
+
+# The calculator module imports matplotlib for its plots, which is not a package dependency
+pytest.importorskip("matplotlib")
+
+from statsmodels.stats.power import NormalIndPower  # noqa: E402
+
+from avos.sample_size_calculator import (  # noqa: E402
+    _sample_sizes_continuous,
+    _sample_sizes_proportions,
+    calculate_sample_size_continuous,
+    calculate_sample_size_proportions,
+    sensitivity_analysis_proportions,
+)
+
+
+def cohen_h(p1, p0):
+    return 2 * math.asin(math.sqrt(p1)) - 2 * math.asin(math.sqrt(p0))
+
+
+def statsmodels_sample_size(baseline_rate, mde, alpha, power, alternative):
+    effect_size = abs(cohen_h(baseline_rate * (1 + mde), baseline_rate))
+    return math.ceil(
+        NormalIndPower().solve_power(effect_size=effect_size, alpha=alpha, power=power, alternative=alternative)
+    )
+
+
+@pytest.mark.parametrize("alternative", ["two-sided", "larger"])
+@pytest.mark.parametrize("baseline_rate", [0.05, 0.1, 0.2, 0.5])
+@pytest.mark.parametrize("mde", [0.02, 0.05, 0.1, 0.3])
+@pytest.mark.parametrize("power", [0.5, 0.8, 0.9])
+def test_proportions_sample_size_matches_statsmodels(alternative, baseline_rate, mde, power):
+    result = calculate_sample_size_proportions(baseline_rate, mde, alpha=0.05, power=power, alternative=alternative)
+    assert result["sample_size"] == statsmodels_sample_size(baseline_rate, mde, 0.05, power, alternative)
+
+
+@pytest.mark.parametrize(
+    "baseline_rate, mde, power, expected",
+    [
+        # Low-power cases where dropping the far tail would round one unit higher
+        (0.1, 0.1, 0.5, 7216),
+        (0.2, 0.05, 0.5, 12519),
+    ],
+)
+def test_two_sided_sample_size_counts_far_tail(baseline_rate, mde, power, expected):
+    result = calculate_sample_size_proportions(baseline_rate, mde, power=power)
+    assert result["sample_size"] == expected
+
+
+@pytest.mark.parametrize("alternative", ["two-sided", "larger"])
+@pytest.mark.parametrize("baseline_rate", [0.05, 0.2, 0.5])
+@pytest.mark.parametrize("sample_size", [500, 5000, 50000])
+def test_proportions_sensitivity_round_trips_sample_size(alternative, baseline_rate, sample_size):
+    mde = sensitivity_analysis_proportions(baseline_rate, sample_size, alternative=alternative)["mde"]
+    assert mde > 0
+    # The closed-form inversion reproduces the effect size statsmodels solves for
+    effect_size = NormalIndPower().solve_power(nobs1=sample_size, alpha=0.05, power=0.8, alternative=alternative)
+    assert cohen_h(baseline_rate * (1 + mde), baseline_rate) == pytest.approx(effect_size, rel=1e-9)
+    # statsmodels solves the effect size only to its root-finder tolerance; large samples can land a few units off
+    result = calculate_sample_size_proportions(baseline_rate, mde, alternative=alternative)
+    assert result["sample_size"] == pytest.approx(sample_size, rel=1e-4, abs=1)
+
+
+def test_proportions_sensitivity_is_nan_when_target_rate_reaches_one():
+    # Ten users per group need a larger lift than 0.9 can take without reaching a rate of 1
+    mde = sensitivity_analysis_proportions(0.9, 10)["mde"]
+    assert math.isnan(mde)
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05, 0.1])
+@pytest.mark.parametrize("power", [0.5, 0.8, 0.95])
+@pytest.mark.parametrize("baseline_mean, std", [(10, 4), (100, 50), (1, 3)])
+def test_continuous_power_curve_grid_matches_calculator(alpha, power, baseline_mean, std):
+    mde_values = np.linspace(0.02, 0.5, 10)
+    sample_sizes = _sample_sizes_continuous(baseline_mean, std, mde_values, alpha, power)
+    for mde, sample_size in zip(mde_values, sample_sizes):
+        expected = calculate_sample_size_continuous(baseline_mean, mde, std, alpha=alpha, power=power)["sample_size"]
+        # The documented bound: 0.2% plus one unit
+        assert abs(sample_size - expected) <= 0.002 * expected + 1
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05, 0.1])
+@pytest.mark.parametrize("power", [0.5, 0.8, 0.95])
+@pytest.mark.parametrize("baseline_rate", [0.02, 0.1, 0.3])
+def test_proportions_power_curve_grid_matches_calculator(alpha, power, baseline_rate):
+    mde_values = np.linspace(0.01, 0.5, 10)
+    sample_sizes = _sample_sizes_proportions(baseline_rate, mde_values, alpha, power)
+    for mde, sample_size in zip(mde_values, sample_sizes):
+        expected = calculate_sample_size_proportions(baseline_rate, mde, alpha=alpha, power=power)["sample_size"]
+        assert abs(sample_size - expected) <= 0.002 * expected + 1
+
+
+def test_proportions_power_curve_grid_masks_target_rates_at_or_above_one():
+    # 0.8 * 1.25 is exactly 1
+    mde_values = np.array([0.1, 0.2, 0.25, 0.3, 0.5])
+    sample_sizes = _sample_sizes_proportions(0.8, mde_values, 0.05, 0.8)
+    assert np.isnan(sample_sizes).tolist() == [False, False, True, True, True]
+    assert sample_sizes[0] == calculate_sample_size_proportions(0.8, 0.1)["sample_size"]
@@ -1,3 +1,4 @@
+import hashlib
 import pytest
 from avos.services.splitter import (
     HashBasedSplitter,
@@ -19,6 +20,39 @@ def test_hash_based_splitter_deterministic():
     assert v1 == v2  # Deterministic
 
 
+def test_hash_based_splitter_matches_linear_bucket_scan():
+    splitter = HashBasedSplitter("exp_scan")
+    variants = ["A", "B", "C"]
+    allocs = [0.2, 0.3, 0.5]
+    for i in range(2000):
+        uid = f"user{i}"
+        val = int(hashlib.md5(f"{uid}exp_scan".encode()).hexdigest(), 16) / 2**128
+        cumulative, expected = 0.0, variants[-1]
+        for variant, alloc in zip(variants, allocs):
+            cumulative += alloc
+            if val < cumulative:
+                expected = variant
+                break
+        assert splitter.assign_variant(uid, variants, allocs) == expected
+
+
+def test_hash_based_splitter_revalidates_changed_allocations():
+    splitter = HashBasedSplitter("exp_change")
+    assert splitter.assign_variant("user1", ["A", "B"], [0.5, 0.5]) in ["A", "B"]
+    with pytest.raises(ValueError):
+        splitter.assign_variant("user1", ["A", "B"], [0.5, 0.4])
+    assert splitter.assign_variant("user1", ["A", "B"], [1.0, 0.0]) == "A"
+
+
+def test_hash_based_splitter_batch_matches_single():
+    splitter = HashBasedSplitter("exp_batch")
+    variants = ["A", "B", "C"]
+    allocs = [0.2, 0.3, 0.5]
+    uids = [f"user{i}" for i in range(500)] + [42]
+    assigned = splitter.assign_variants(uids, variants, allocs)
+    assert assigned == [splitter.assign_variant(uid, variants, allocs) for uid in uids]
+
+
 def test_random_splitter_non_deterministic():
     splitter = RandomSplitter()
     variants = ["A", "B"]
@@ -62,6 +96,23 @@ def test_segmented_splitter_per_segment():
     assert res_b_1 in ["A", "B"]
 
 
+def test_segmented_splitter_matches_linear_bucket_scan():
+    config = {"web": {"A": 0.2, "B": 0.3, "C": 0.5}, "ios": {"A": 0.6, "B": 0.0, "C": 0.4}}
+    splitter = SegmentedSplitter("exp_seg_scan", config)
+    variants = ["A", "B", "C"]
+    for segment, allocs in config.items():
+        for i in range(1000):
+            uid = f"user{i}"
+            val = int(hashlib.md5(f"{uid}exp_seg_scan{segment}".encode()).hexdigest(), 16) / 2**128
+            cumulative, expected = 0.0, variants[-1]
+            for variant in variants:
+                cumulative += allocs[variant]
+                if val < cumulative:
+                    expected = variant
+                    break
+            assert splitter.assign_variant(uid, variants, None, segment=segment) == expected
+
+
 def test_geo_based_splitter_per_geo():
     config = {"US": {"A": 0.5, "B": 0.5}, "UK": {"A": 0.1, "B": 0.9}}
     splitter = GeoBasedSplitter("exp_geo", config)
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
@@ -9,6 +10,7 @@ from avos.services.assignment_service import AssignmentService
 from avos.services.layer_service import LayerService
 from avos.services.config_sync import apply_layer_configs
 from avos.services.splitter import HashBasedSplitter
+from avos.srm_tester import SRMTester
 
 
 def _make_session():
@@ -114,3 +116,39 @@ def test_ramp_up_keeps_existing_assignments():
         assert updated["status"] == "assigned"
         assert updated["experiment_id"] == exp_id
         assert updated["variant"] == variant
+
+
+def test_layer_salts_split_units_independently():
+    unit_ids = [f"user_{i}" for i in range(10000)]
+    slots_a = AssignmentService._calculate_user_slots("salt_a", 1000, unit_ids)
+    slots_b = AssignmentService._calculate_user_slots("salt_b", 1000, unit_ids)
+
+    in_a = np.flatnonzero(slots_a < 300)
+    in_b = np.flatnonzero(slots_b < 300)
+    overlap = np.intersect1d(in_a, in_b, assume_unique=True).size
+
+    # Independent layers: 30% of 30% of units share the first 300 slots of both
+    assert abs(overlap / len(unit_ids) - 0.09) < 0.015
+
+
+def test_blake2b_layer_aa_split_has_no_srm():
+    session = _make_session()
+    layer = LayerService.create_layer(session, "layer_aa", "salt_aa", hash_algo="blake2b")
+    experiment = Experiment(
+        experiment_id="exp_aa",
+        layer_id="layer_aa",
+        name="A/A",
+        variants=["A", "B"],
+        traffic_allocation={"A": 0.5, "B": 0.5},
+        traffic_percentage=0.5,
+        status=ExperimentStatus.ACTIVE,
+    )
+    assert LayerService.add_experiment(session, layer, experiment) is True
+
+    unit_ids = [f"user_{i}" for i in range(20000)]
+    assignments = AssignmentService.assign_bulk_for_layer(session, layer, unit_ids)
+    assigned = [a["variant"] for a in assignments.values() if a["status"] == "assigned"]
+
+    assert abs(len(assigned) / len(unit_ids) - 0.5) < 0.03
+    result = SRMTester().test([assigned.count("A"), assigned.count("B")], [0.5, 0.5])
+    assert not result.reject_null
@@ -1,5 +1,6 @@
 import pytest
 import numpy as np
+from scipy.stats import chi2
 from avos.srm_tester import SRMTester
 
 
@@ -158,3 +159,72 @@ class TestDefaultBehaviorSRMTester:
         result = srm_tester.test(observed, expected)
 
         assert not result.reject_null
+
+
+class TestBatchSRMTester:
+    """Batch tests"""
+
+    def test_batch_matches_individual_tests(self, srm_tester):
+        """Vectorized batch results equal one-by-one results, in input order"""
+        experiments_data = {
+            "two_arm": {"observed": [4850, 5150], "expected": [0.5, 0.5]},
+            "imbalanced": {"observed": [1200, 800], "expected": [0.5, 0.5]},
+            "three_arm": {"observed": [2500, 2000, 1500], "expected": [0.4, 0.35, 0.25]},
+            "default_split": {"observed": [510, 490]},
+        }
+        results = srm_tester.batch_test(experiments_data)
+
+        assert list(results) == list(experiments_data)
+        for exp_id, data in experiments_data.items():
+            single = srm_tester.test(data["observed"], data.get("expected"))
+            batched = results[exp_id]
+            assert batched.chi2_stat == pytest.approx(single.chi2_stat)
+            assert batched.p_value == pytest.approx(single.p_value)
+            assert batched.degrees_of_freedom == single.degrees_of_freedom
+            assert batched.reject_null == single.reject_null
+            assert batched.severity == single.severity
+            assert batched.observed_counts == single.observed_counts
+            assert batched.expected_counts == pytest.approx(single.expected_counts)
+            assert batched.total_sample_size == single.total_sample_size
+
+    def test_batch_skips_invalid_experiments(self, srm_tester):
+        """Invalid inputs are reported and skipped without affecting the rest"""
+        experiments_data = {
+            "valid": {"observed": [100, 100]},
+            "single_group": {"observed": [100]},
+            "mismatched": {"observed": [100, 100], "expected": [0.5, 0.3, 0.2]},
+        }
+        results = srm_tester.batch_test(experiments_data)
+
+        assert list(results) == ["valid"]
+
+
+class TestCriticalValueSRMTester:
+    def test_critical_value_matches_chi2_ppf(self, srm_tester):
+        for dof in (1, 2, 5):
+            assert srm_tester.critical_value(dof) == pytest.approx(chi2.ppf(0.95, dof))
+        assert srm_tester.critical_value(1, alpha=0.01) == pytest.approx(chi2.ppf(0.99, 1))
+
+    def test_critical_value_is_cached(self, srm_tester, monkeypatch):
+        expected = srm_tester.critical_value(3, alpha=0.02)
+
+        def fail(*args, **kwargs):
+            raise AssertionError("chi2.ppf recomputed")
+
+        monkeypatch.setattr("avos.srm_tester.chi2.ppf", fail)
+        assert srm_tester.critical_value(3, alpha=0.02) == expected
+
+
+class TestCachedSRMTester:
+    def test_repeat_counts_reuse_chisquare(self, srm_tester, monkeypatch):
+        first = srm_tester.test([4321, 4455], [0.5, 0.5])
+
+        def fail(*args, **kwargs):
+            raise AssertionError("chisquare recomputed")
+
+        monkeypatch.setattr("avos.srm_tester.chisquare", fail)
+        again = srm_tester.test(np.array([4321, 4455]), [0.5, 0.5])
+
+        assert again.chi2_stat == first.chi2_stat
+        assert again.p_value == first.p_value
+        assert again.observed_counts == first.observed_counts